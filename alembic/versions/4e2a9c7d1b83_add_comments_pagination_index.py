@@ -0,0 +1,28 @@
+"""Add comments (post_id, created_at, id) index
+
+Revision ID: 4e2a9c7d1b83
+Revises: bcdcc73f3623
+Create Date: 2026-10-19 12:20:11.504127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e2a9c7d1b83'
+down_revision: Union[str, Sequence[str], None] = 'bcdcc73f3623'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_comments_post_id_created_at_id', 'comments', ['post_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='comments')
@@ -0,0 +1,56 @@
+"""Add posts.media_variants_ready and users.profile_picture_variants_ready
+
+Revision ID: 5d8b2f6e1c47
+Revises: 7c1d3e5f9a20
+Create Date: 2026-10-19 15:12:47.603918
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8b2f6e1c47'
+down_revision: Union[str, Sequence[str], None] = '7c1d3e5f9a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same layout as app/services/file_service (run from the project root,
+# next to uploads/); "full" is the last rendition written.
+UPLOAD_DIR = "uploads"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _rendered(url: str) -> bool:
+    stem, ext = os.path.splitext(url)
+    if ext.lower() not in IMAGE_EXTENSIONS or not url.startswith("/uploads/"):
+        return False
+    return os.path.exists(os.path.join(UPLOAD_DIR, *f"{stem}_full.webp"[len("/uploads/"):].split("/")))
+
+
+def _backfill(table: str, url_column: str, flag_column: str) -> None:
+    bind = op.get_bind()
+    urls = bind.execute(sa.text(
+        f"SELECT DISTINCT {url_column} FROM {table} WHERE {url_column} IS NOT NULL"
+    )).scalars().all()
+    rendered = [{"url": url} for url in urls if _rendered(url)]
+    if rendered:
+        bind.execute(sa.text(f"UPDATE {table} SET {flag_column} = true WHERE {url_column} = :url"), rendered)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('media_variants_ready', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('users', sa.Column('profile_picture_variants_ready', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Renditions generated before the flags existed
+    _backfill('posts', 'media_url', 'media_variants_ready')
+    _backfill('users', 'profile_picture_url', 'profile_picture_variants_ready')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'profile_picture_variants_ready')
+    op.drop_column('posts', 'media_variants_ready')
@@ -0,0 +1,30 @@
+"""Index posts.media_url and users.profile_picture_url
+
+Revision ID: 7c1d3e5f9a20
+Revises: 4e2a9c7d1b83
+Create Date: 2026-10-19 14:05:32.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d3e5f9a20'
+down_revision: Union[str, Sequence[str], None] = '4e2a9c7d1b83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_posts_media_url'), 'posts', ['media_url'], unique=False)
+    op.create_index(op.f('ix_users_profile_picture_url'), 'users', ['profile_picture_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_profile_picture_url'), table_name='users')
+    op.drop_index(op.f('ix_posts_media_url'), table_name='posts')
@@ -0,0 +1,28 @@
+"""Add users.updated_at
+
+Revision ID: 9a6f3c1e7d52
+Revises: 5d8b2f6e1c47
+Create Date: 2026-10-19 16:02:19.540127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6f3c1e7d52'
+down_revision: Union[str, Sequence[str], None] = '5d8b2f6e1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'updated_at')
@@ -0,0 +1,33 @@
+"""Add likes_count to posts
+
+Revision ID: bcdcc73f3623
+Revises: 35815d565142
+Create Date: 2026-10-19 10:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bcdcc73f3623'
+down_revision: Union[str, Sequence[str], None] = '35815d565142'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the existing likes
+    op.execute(
+        "UPDATE posts SET likes_count = "
+        "(SELECT count(*) FROM likes WHERE likes.post_id = posts.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'likes_count')
@@ -1,11 +1,14 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List
 from app.api.deps import get_current_user
+from app.core.profiling import ProfiledRoute
 from app.models.user import User
-from app.services.ai_service import get_ai_service
+from app.services.ai_service import GroqAIService, get_ai_service
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 class BioGenerateRequest(BaseModel):
@@ -17,9 +20,10 @@ class BioGenerateResponse(BaseModel):
 
 
 @router.post("/generate-bio", response_model=BioGenerateResponse)
-def generate_bio(
+async def generate_bio(
     request: BioGenerateRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    ai_service: GroqAIService = Depends(get_ai_service)
 ):
     """
     Generate AI-powered bio suggestions based on user keywords.
@@ -27,7 +31,53 @@ def generate_bio(
     Example keywords: "photographer, traveler, coffee lover"
     Returns 3 creative bio suggestions.
     """
-    ai_service = get_ai_service()
-    suggestions = ai_service.generate_bio_suggestions(request.keywords)
+    suggestions = await ai_service.generate_bio_suggestions(request.keywords)
     
     return BioGenerateResponse(suggestions=suggestions)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/generate-bio/stream")
+async def generate_bio_stream(
+    request: BioGenerateRequest,
+    current_user: User = Depends(get_current_user),
+    ai_service: GroqAIService = Depends(get_ai_service)
+):
+    """
+    Server-Sent Events version of /generate-bio.
+
+    Events: `token` (raw model output as it arrives), `bio` (one finished
+    suggestion, sent as soon as it is complete), then `done`, or `error`
+    with a `detail` if generation fails mid-stream.
+    """
+    # Validate before the 200 response starts so bad input still gets a 400
+    ai_service.validate_keywords(request.keywords)
+
+    async def events():
+        try:
+            async for event, data in ai_service.stream_bio_suggestions(request.keywords):
+                yield _sse(event, data)
+        except HTTPException as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail})
+            return
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def read_ai_stats(
+    current_user: User = Depends(get_current_user),
+    ai_service: GroqAIService = Depends(get_ai_service)
+):
+    """
+    Bio cache hit rate, coalesced requests, circuit breaker state and upstream latency.
+    """
+    return ai_service.stats()
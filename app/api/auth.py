@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from app.core.profiling import ProfiledRoute
 from app.core.security import create_access_token, create_refresh_token
 from app.api.deps import get_db, get_current_user
 from app.services import auth_service
@@ -13,7 +14,7 @@ from app.schemas.user import (
     ResetPasswordRequest
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/register", response_model=UserSchema)
 def register(user_in: UserCreate, db: Session = Depends(get_db)):
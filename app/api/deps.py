@@ -1,13 +1,13 @@
-from typing import Generator, Optional
+from typing import Generator, List, Optional, Sequence
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.db.loaders import get_user_loader
 from app.db.session import SessionLocal, get_db
 from app.models.user import User
 from app.schemas.user import TokenPayload
-from app.services import user_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -26,7 +26,24 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
-    user = user_service.get(db, token_data.sub)
+    # Through the loader so the viewer is never fetched twice in a request
+    user = get_user_loader(db).load(token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], required: Sequence[str] = ("id",)) -> Optional[List[str]]:
+    """
+    Turn a ?fields=a,b,c parameter into a field list (required fields
+    always included), or None when the parameter is absent.
+    """
+    if fields is None:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return list(dict.fromkeys([*required, *requested]))
@@ -0,0 +1,19 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response
+from app.core import metrics
+from app.core.config import settings
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus scrape endpoint. Async on purpose: it must read the metrics
+    on the event loop thread, the only thread that writes them.
+    """
+    if not settings.METRICS_TOKEN or not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -2,11 +2,13 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.api.deps import get_current_user, get_db
+from app.core.profiling import ProfiledRoute
+from app.core.serialization import json_response
 from app.models.user import User
 from app.schemas.notification import Notification as NotificationSchema
 from app.services import notification_service
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/", response_model=List[NotificationSchema])
 def get_notifications(
@@ -18,7 +20,10 @@ def get_notifications(
     """
     Get current user's notifications.
     """
-    return notification_service.get_my_notifications(db, current_user.id, limit, skip)
+    return json_response(
+        List[NotificationSchema],
+        notification_service.get_my_notifications(db, current_user.id, limit, skip),
+    )
 
 @router.post("/read-all")
 def mark_all_read(
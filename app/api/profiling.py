@@ -0,0 +1,36 @@
+import secrets
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from app.core.config import settings
+from app.schemas.profile import ProfileSummary
+
+def require_profiling_token(authorization: Optional[str] = Header(None)) -> None:
+    if not settings.PROFILING_TOKEN or not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.PROFILING_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+# Async routes: the profile store is only touched on the event loop thread
+
+@router.get("/", response_model=List[ProfileSummary])
+async def list_profiles(request: Request):
+    """
+    Recently profiled requests, newest first.
+    """
+    return request.app.state.profiles.summaries()
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str, request: Request):
+    """
+    Collapsed stacks ("frame;frame;frame count" per line) for flamegraph.pl or speedscope.
+    """
+    profile = request.app.state.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        profile.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -1,20 +1,37 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user, get_db, parse_fields
 from app.models.user import User
-from app.schemas.user import UserPublic
+from app.schemas.user import UserPublic, UserWithRelationship, RelationshipQuery, Relationship, BulkFollowRequest, BulkFollowResult
 from app.schemas.social import (
     PostCreate, 
     Post as PostSchema, 
     CommentCreate, 
     Comment as CommentSchema, 
     PostUpdate, 
-    PostDetail
+    PostDetail,
+    PostPage,
+    CommentPage,
+    SuggestedUser
 )
-from app.services import post_service, social_service
+from app.core.config import settings
+from app.core.etag import PRIVATE_REVALIDATE, make_etag, is_not_modified, not_modified
+from app.core.serialization import json_response
+from app.core.profiling import ProfiledRoute
+from app.services import post_service, social_service, user_service, like_buffer_service, suggestion_service
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+FIELDS_POSTS = "Comma-separated subset of post fields, e.g. id,content_text,likes_count (selected in SQL)"
+FIELDS_USERS = "Comma-separated subset of user fields, e.g. id,username,profile_picture_url (selected in SQL)"
+NORMALIZE = "Return {posts, users}: posts refer to owners by user_id, each owner is sent once"
+
+def _post_list_response(db: Session, posts: list, fields: Optional[List[str]], normalize: bool, headers=None):
+    # Sparse rows are plain dicts of the requested fields: no schema to apply
+    if normalize:
+        return json_response(Any if fields else PostPage, post_service.with_owner_table(db, posts), headers=headers)
+    return json_response(Any if fields else List[PostSchema], posts, headers=headers)
 
 # --- Posts ---
 @router.post("/", response_model=PostSchema)
@@ -48,38 +65,122 @@ def delete_post(
         raise HTTPException(status_code=403, detail="Not authorized to delete this post or post not found")
     return {"message": "Post deleted successfully"}
 
-@router.get("/feed", response_model=List[PostSchema])
+@router.get("/feed", response_model=Union[List[PostSchema], PostPage])
 def read_feed(
+    request: Request,
     skip: int = 0,
     limit: int = 50,
+    fields: Optional[str] = Query(None, description=FIELDS_POSTS),
+    normalize: bool = Query(False, description=NORMALIZE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    field_list = parse_fields(fields, post_service.POST_FIELDS, ("id", "user_id") if normalize else ("id",))
+    version = post_service.get_feed_version(db, current_user.id, limit, skip)
+    headers = {
+        "ETag": make_etag("feed", current_user.id, skip, limit, field_list, normalize, version),
+        "Cache-Control": PRIVATE_REVALIDATE,
+        "Vary": "Authorization",
+    }
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    posts = post_service.get_feed(db, current_user.id, limit, skip, field_list)
+    return _post_list_response(db, posts, field_list, normalize, headers)
+
+@router.get("/suggestions", response_model=List[SuggestedUser])
+def read_suggestions(
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return post_service.get_feed(db, current_user.id, limit, skip)
+    """
+    People you may know: accounts followed by the people you follow,
+    ranked by the number of mutual follows.
+    """
+    return json_response(List[SuggestedUser], suggestion_service.get_suggestions(db, current_user.id, limit))
 
 @router.get("/{post_id}", response_model=PostDetail)
 def read_post(
     post_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    version = post_service.get_post_version(db, post_id, current_user.id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    headers = {
+        "ETag": make_etag("post", current_user.id, version),
+        "Cache-Control": PRIVATE_REVALIDATE,
+        "Vary": "Authorization",
+    }
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+
     post = post_service.get_post(db, post_id, current_user.id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    return json_response(PostDetail, post, headers=headers)
+
+@router.get("/{post_id}/comments", response_model=CommentPage)
+def read_comments(
+    post_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(post_service.COMMENTS_PAGE_SIZE, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    A post's comments, oldest first, one page at a time.
+    """
+    if not post_service.post_exists(db, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+    comments, next_cursor = post_service.get_comments_page(db, post_id, cursor, limit)
+    return json_response(CommentPage, {"comments": comments, "next_cursor": next_cursor})
 
-@router.get("/user/{user_id}", response_model=List[PostSchema])
+@router.get("/user/{user_id}", response_model=Union[List[PostSchema], PostPage])
 def read_user_posts(
     user_id: int,
     skip: int = 0,
     limit: int = 50, 
+    fields: Optional[str] = Query(None, description=FIELDS_POSTS),
+    normalize: bool = Query(False, description=NORMALIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return post_service.get_user_posts(db, user_id, current_user.id, limit, skip)
+    field_list = parse_fields(fields, post_service.POST_FIELDS, ("id", "user_id") if normalize else ("id",))
+    posts = post_service.get_user_posts(db, user_id, current_user.id, limit, skip, field_list)
+    return _post_list_response(db, posts, field_list, normalize)
 
 
 # --- Follows ---
+@router.post("/relationships", response_model=List[Relationship])
+def read_relationships(
+    query: RelationshipQuery,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Follow status between the current user and up to 500 users, in one call.
+    """
+    relationships = social_service.get_relationships(db, current_user.id, query.user_ids)
+    return [
+        Relationship(user_id=user_id, following=following, followed_by=followed_by)
+        for user_id, (following, followed_by) in relationships.items()
+    ]
+
+@router.post("/follow/bulk", response_model=List[BulkFollowResult])
+def bulk_follow(
+    request: BulkFollowRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Follow up to 500 users in one transaction (onboarding, contact import).
+    Each id is reported as followed, already_following, not_found or self.
+    """
+    return social_service.bulk_follow(db, current_user.id, request.user_ids)
+
 @router.post("/{user_id}/follow")
 def follow_user(
     user_id: int,
@@ -102,21 +203,33 @@ def unfollow_user(
         raise HTTPException(status_code=404, detail="Follow relationship not found")
     return {"message": "Unfollowed successfully"}
 
-@router.get("/{user_id}/followers", response_model=List[UserPublic])
+@router.get("/{user_id}/followers", response_model=List[UserWithRelationship])
 def get_user_followers(
     user_id: int,
+    include_relationship: bool = Query(False, description="Add is_following / is_followed_by"),
+    fields: Optional[str] = Query(None, description=FIELDS_USERS),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return social_service.get_followers(db, user_id)
+    field_list = parse_fields(fields, user_service.USER_FIELDS)
+    users = social_service.get_followers(db, user_id, field_list)
+    if include_relationship:
+        users = social_service.with_relationships(db, current_user.id, users)
+    return json_response(Any if field_list else List[UserWithRelationship], users)
 
-@router.get("/{user_id}/following", response_model=List[UserPublic])
+@router.get("/{user_id}/following", response_model=List[UserWithRelationship])
 def get_user_following(
     user_id: int,
+    include_relationship: bool = Query(False, description="Add is_following / is_followed_by"),
+    fields: Optional[str] = Query(None, description=FIELDS_USERS),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return social_service.get_following(db, user_id)
+    field_list = parse_fields(fields, user_service.USER_FIELDS)
+    users = social_service.get_following(db, user_id, field_list)
+    if include_relationship:
+        users = social_service.with_relationships(db, current_user.id, users)
+    return json_response(Any if field_list else List[UserWithRelationship], users)
 
 # --- Interactions ---
 @router.post("/{post_id}/like")
@@ -125,7 +238,11 @@ def like_post(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not post_service.like_post(db, current_user.id, post_id):
+    if settings.LIKE_WRITE_BEHIND:
+        if not like_buffer_service.post_exists(db, post_id):
+            raise HTTPException(status_code=404, detail="Post not found")
+        like_buffer_service.record(current_user.id, post_id, liked=True)
+    elif not post_service.like_post(db, current_user.id, post_id):
         raise HTTPException(status_code=404, detail="Post not found")
     return {"message": "Post liked"}
 
@@ -135,7 +252,14 @@ def unlike_post(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    post_service.unlike_post(db, current_user.id, post_id)
+    # Both modes: 404 for a missing post; unliking a post that isn't liked
+    # succeeds (the buffer can't tell, a like may still be pending in it)
+    if settings.LIKE_WRITE_BEHIND:
+        if not like_buffer_service.post_exists(db, post_id):
+            raise HTTPException(status_code=404, detail="Post not found")
+        like_buffer_service.record(current_user.id, post_id, liked=False)
+    elif not post_service.unlike_post(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
     return {"message": "Post unliked"}
 
 @router.post("/{post_id}/comment", response_model=CommentSchema)
@@ -1,18 +1,81 @@
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, BackgroundTasks, Header, Request
 from app.api.deps import get_current_user
+from app.core.profiling import ProfiledRoute
 from app.models.user import User
-from app.services import file_service
+from app.schemas.upload import UploadSessionCreate, UploadSession
+from app.services import file_service, upload_session_service
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
     """
     Upload a file (image/video) and return its URL.
+    Image renditions are generated after the response is sent.
     """
     file_url, filename = await file_service.save_upload_file(file)
+    background_tasks.add_task(file_service.generate_variants, file_url)
     
-    return {"url": file_url, "filename": filename}
+    return {
+        "url": file_url,
+        "filename": filename,
+        "variants": file_service.get_variant_urls(file_url),
+    }
+
+# --- Resumable uploads ---
+# 1. POST /sessions with filename and size
+# 2. PUT /sessions/{id} with a Content-Range header and raw bytes, repeatedly
+# 3. GET /sessions/{id} after a dropped connection to find where to resume
+# 4. POST /sessions/{id}/complete to move the file into the store
+
+@router.post("/sessions", response_model=UploadSession)
+def create_upload_session(
+    session_in: UploadSessionCreate,
+    current_user: User = Depends(get_current_user)
+):
+    return upload_session_service.create_session(current_user.id, session_in.filename, session_in.size)
+
+@router.get("/sessions/{session_id}", response_model=UploadSession)
+def read_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    return upload_session_service.get_session(current_user.id, session_id)
+
+@router.put("/sessions/{session_id}", response_model=UploadSession)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    content_range: str = Header(...),
+    current_user: User = Depends(get_current_user)
+):
+    return await upload_session_service.append_chunk(
+        current_user.id, session_id, content_range, request.stream()
+    )
+
+@router.post("/sessions/{session_id}/complete")
+async def complete_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+):
+    file_url, filename = await upload_session_service.complete_session(current_user.id, session_id)
+    background_tasks.add_task(file_service.generate_variants, file_url)
+
+    return {
+        "url": file_url,
+        "filename": filename,
+        "variants": file_service.get_variant_urls(file_url),
+    }
+
+@router.delete("/sessions/{session_id}")
+def cancel_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    upload_session_service.cancel_session(current_user.id, session_id)
+    return {"message": "Upload session cancelled"}
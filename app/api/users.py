@@ -1,24 +1,35 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from app.api.deps import get_current_user, get_db
-from app.schemas.user import User as UserSchema, UserPublic, UserUpdate, UserPasswordUpdate
-from app.services import user_service
+from app.api.deps import get_current_user, get_db, parse_fields
+from app.core.profiling import ProfiledRoute
+from app.core.etag import make_etag, is_not_modified, not_modified
+from app.core.serialization import json_response
+from app.schemas.user import User as UserSchema, UserPublic, UserUpdate, UserPasswordUpdate, UserWithRelationship
+from app.services import user_service, social_service
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.get("/search", response_model=List[UserPublic])
+@router.get("/search", response_model=List[UserWithRelationship])
 def search_users(
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(20, ge=1, le=50),
+    include_relationship: bool = Query(False, description="Add is_following / is_followed_by"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated subset of user fields, e.g. id,username,profile_picture_url (selected in SQL)"
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Search for users by username or full name.
     """
-    return user_service.search_users(db, q, limit)
+    field_list = parse_fields(fields, user_service.USER_FIELDS)
+    users = user_service.search_users(db, q, limit, field_list)
+    if include_relationship:
+        users = social_service.with_relationships(db, current_user.id, users)
+    return json_response(Any if field_list else List[UserWithRelationship], users)
 
 @router.get("/me", response_model=UserSchema)
 def read_user_me(current_user: User = Depends(get_current_user)):
@@ -45,15 +56,26 @@ def update_user_me(
     return updated_user
 
 @router.get("/{username}", response_model=UserPublic)
-def read_user(username: str, db: Session = Depends(get_db)):
+def read_user(username: str, request: Request, db: Session = Depends(get_db)):
     """
     Get specific user profile by username (Public info only).
     """
+    version = user_service.get_profile_version(db, username)
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Same body for every viewer: shared caches may keep it briefly
+    headers = {
+        "ETag": make_etag("user", version),
+        "Cache-Control": "public, max-age=30",
+    }
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+
     user_public = user_service.get_public_profile(db, username)
     if not user_public:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    return user_public
+    return json_response(UserPublic, user_public, headers=headers)
 
 @router.put("/me/password")
 def update_password_me(
@@ -0,0 +1,158 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Offers zstd, brotli and gzip, in that order of preference, when the client
+accepts them. brotli and zstd are optional: install the `brotli` /
+`zstandard` packages to enable them, otherwise only gzip is offered.
+
+Skipped:
+- bodies under COMPRESSION_MINIMUM_SIZE (headers would cost more than the
+  savings),
+- anything under the excluded path prefixes (/uploads is content-addressed
+  media, already compressed and served zero-copy),
+- already-compressed media types, responses that already carry a
+  Content-Encoding, and Server-Sent Events.
+
+Streaming responses are compressed chunk by chunk and flushed after every
+chunk so clients are never left waiting on a half-full compressor.
+
+Default levels (gzip 4, brotli 4, zstd 3) come from
+benchmarks/bench_compression.py on feed and follower-list payloads, where
+each sits at the knee of its codec's cost curve: e.g. gzip 6 costs ~60%
+more CPU for ~8% fewer bytes, and brotli 9+ is 10x slower.
+"""
+from typing import Iterable, Optional, Sequence
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INCOMPRESSIBLE_TYPES = (
+    "image/", "video/", "audio/",
+    "application/zip", "application/gzip", "application/x-gzip",
+    "application/octet-stream", "font/woff",
+)
+
+
+class _SkipIncompressible:
+    """Responder mixin: leave already-compressed media types untouched."""
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_compression(message)
+            if content_type.startswith(INCOMPRESSIBLE_TYPES):
+                self.content_type_is_excluded = True
+            return
+        await super().send_with_compression(message)
+
+
+class GzipResponder(_SkipIncompressible, GZipResponder):
+    pass
+
+
+class BrotliResponder(_SkipIncompressible, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        out = self.compressor.process(body)
+        return out + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class ZstdResponder(_SkipIncompressible, IdentityResponder):
+    content_encoding = "zstd"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, level: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        out = self.compressor.compress(body)
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK if more_body else zstandard.COMPRESSOBJ_FLUSH_FINISH
+        return out + self.compressor.flush(flush_mode)
+
+
+def available_encodings() -> list[str]:
+    """Encodings this process can produce, most preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate(accept_encoding: str, offered: Sequence[str]) -> Optional[str]:
+    """
+    Pick the encoding to use: highest client q-value first, our preference
+    order (offered) to break ties. None means send the body as-is.
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 4,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        exclude_paths: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.exclude_paths = tuple(exclude_paths)
+        self.offered = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.offered)
+        responder: ASGIApp
+        if encoding == "zstd":
+            responder = ZstdResponder(self.app, self.minimum_size, self.zstd_level)
+        elif encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GzipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
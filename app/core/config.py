@@ -16,5 +16,52 @@ class Settings(BaseSettings):
     SENDER_EMAIL: str = os.getenv("SENDER_EMAIL")
     SENDER_PASSWORD: str = os.getenv("SENDER_PASSWORD")
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    AI_CACHE_SIZE: int = int(os.getenv("AI_CACHE_SIZE", 1024))
+    AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", 6 * 60 * 60))
+    AI_TIMEOUT_SECONDS: float = float(os.getenv("AI_TIMEOUT_SECONDS", 10))
+    AI_HEDGE_DELAY_SECONDS: float = float(os.getenv("AI_HEDGE_DELAY_SECONDS", 3))
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", 8))
+    AI_BREAKER_THRESHOLD: int = int(os.getenv("AI_BREAKER_THRESHOLD", 5))
+    AI_BREAKER_RESET_SECONDS: float = float(os.getenv("AI_BREAKER_RESET_SECONDS", 30))
+
+    # Buffer likes in memory and flush in batches (see like_buffer_service)
+    LIKE_WRITE_BEHIND: bool = os.getenv("LIKE_WRITE_BEHIND", "false").lower() == "true"
+    LIKE_FLUSH_INTERVAL_MS: int = int(os.getenv("LIKE_FLUSH_INTERVAL_MS", 250))
+
+    # Serve follow checks / counts from an in-memory index (see follow_graph_service)
+    FOLLOW_GRAPH_INDEX: bool = os.getenv("FOLLOW_GRAPH_INDEX", "false").lower() == "true"
+    FOLLOW_GRAPH_REBUILD_SECONDS: int = int(os.getenv("FOLLOW_GRAPH_REBUILD_SECONDS", 300))
+
+    SUGGESTIONS_CACHE_SIZE: int = int(os.getenv("SUGGESTIONS_CACHE_SIZE", 10000))
+    SUGGESTIONS_CACHE_TTL_SECONDS: int = int(os.getenv("SUGGESTIONS_CACHE_TTL_SECONDS", 600))
+
+    # Response compression (see app/core/compression.py)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 4))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+    # Prometheus metrics at /metrics (see app/core/metrics.py); off by
+    # default, and enabling it requires a token: scrapers must send
+    # "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Per-request profiling (see app/core/profiling.py): requests sending
+    # "X-Profile: <token>" are profiled, plus PROFILING_SAMPLE_RATE of all
+    # requests; /admin/profiles takes "Authorization: Bearer <token>".
+    # Off unless a token is set; a sample rate without one is a startup error.
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", 5))
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", 100))
+
+    # Worker processes for image rendition generation
+    MEDIA_WORKERS: int = int(os.getenv("MEDIA_WORKERS", 2))
+    # Internal nginx location aliasing the uploads dir (e.g. "/_uploads/").
+    # When set, /uploads answers with X-Accel-Redirect and nginx sends the
+    # body with sendfile; uvicorn itself can only stream files in chunks.
+    MEDIA_ACCEL_REDIRECT: str = os.getenv("MEDIA_ACCEL_REDIRECT", "")
 
 settings = Settings()
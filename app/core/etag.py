@@ -0,0 +1,34 @@
+"""
+Weak ETags and If-None-Match handling for JSON routes.
+
+Routes derive the tag from cheap version markers (row timestamps, counters,
+the ids on a timeline page) and check it before loading relationships or
+serializing, so a revalidation costs one narrow query and a 304.
+"""
+import hashlib
+from typing import Any, Mapping
+from fastapi import Request, Response
+
+# Per-viewer responses: only the browser may cache, and must revalidate
+PRIVATE_REVALIDATE = "private, no-cache"
+
+def make_etag(*markers: Any) -> str:
+    digest = hashlib.blake2b(repr(markers).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+def _opaque(tag: str) -> str:
+    # Weak comparison (RFC 9110 8.8.3.2): W/"x" matches "x"
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(tag) == target for tag in if_none_match.split(","))
+
+def not_modified(headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers=dict(headers))
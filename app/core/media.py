@@ -0,0 +1,129 @@
+import os
+import re
+from mimetypes import guess_type
+from urllib.parse import quote
+from typing import Dict, Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+# Stored names never change content: sha256 digests (optionally with a
+# rendition suffix) and the legacy uuid4 names.
+CONTENT_NAME_RE = re.compile(
+    r"^(?:(?P<digest>[0-9a-f]{64})(?:_[a-z]+)?|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.[a-z0-9]+$"
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "no-cache"
+# Only worth looking for .br/.gz siblings of text-like files; images and
+# video are already compressed.
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+PRECOMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+# Resized WebP renditions generated for image uploads: name -> longest edge (px)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+VARIANTS = {"thumbnail": 160, "feed": 640, "full": 1440}
+
+
+def variant_url(file_url: str, variant: str) -> str:
+    stem = os.path.splitext(file_url)[0]
+    return f"{stem}_{variant}.webp"
+
+def variant_urls(file_url: Optional[str], ready: bool) -> Optional[Dict[str, str]]:
+    """
+    Rendition URLs for an uploaded image, or the original URL for every
+    rendition while they are not `ready` (the flag stored on the row that
+    references the file). None for non-images.
+    """
+    if not file_url or os.path.splitext(file_url)[1].lower() not in IMAGE_EXTENSIONS:
+        return None
+    if not ready:
+        return {name: file_url for name in VARIANTS}
+    return {name: variant_url(file_url, name) for name in VARIANTS}
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for the uploads store.
+
+    - Cache-Control: immutable for content-named files.
+    - Strong ETag taken from the digest in the file name, so it survives
+      copies between hosts (the default is derived from mtime and size).
+    - Range / If-Range (video seeking) come from FileResponse: single and
+      multipart byte ranges are supported.
+    - Zero-copy transfer needs help from the front server. FileResponse
+      hands the file over via the ASGI pathsend extension, but uvicorn does
+      not offer it and falls back to reading and sending 64 KiB chunks.
+      With `accel_redirect` (an internal nginx location aliasing the
+      store), the response carries only the headers plus X-Accel-Redirect,
+      and nginx sends the body (ranges included) with sendfile.
+    - Optional pre-compressed siblings (<file>.br / <file>.gz), negotiated
+      from Accept-Encoding.
+    """
+
+    def __init__(self, *args, precompressed: bool = False, accel_redirect: str = "", **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.precompressed = precompressed
+        self.accel_redirect = accel_redirect.rstrip("/")
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        headers = {}
+
+        match = CONTENT_NAME_RE.match(name)
+        if match:
+            headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            if match.group("digest"):
+                headers["etag"] = f'"{os.path.splitext(name)[0]}"'
+        else:
+            headers["cache-control"] = DEFAULT_CACHE_CONTROL
+
+        media_type = guess_type(name)[0] or "text/plain"
+        if self.precompressed and media_type.startswith(PRECOMPRESSIBLE_TYPES):
+            headers["vary"] = "Accept-Encoding"
+            encoded = self._find_precompressed(str(full_path), request_headers)
+            if encoded is not None:
+                full_path, stat_result, encoding = encoded
+                headers["content-encoding"] = encoding
+                if "etag" in headers:
+                    headers["etag"] = f'{headers["etag"][:-1]}-{encoding}"'
+
+        if self.accel_redirect:
+            response = Response(headers=headers, media_type=media_type)
+            relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            response.headers["x-accel-redirect"] = f"{self.accel_redirect}/{quote(relative)}"
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+            media_type=media_type,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _find_precompressed(self, full_path: str, request_headers: Headers):
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in request_headers.get("accept-encoding", "").split(",")
+        }
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                return full_path + suffix, os.stat(full_path + suffix), encoding
+            except FileNotFoundError:
+                continue
+        return None
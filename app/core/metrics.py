@@ -0,0 +1,262 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Recording is meant to cost microseconds per request:
+- request metrics are only updated by MetricsMiddleware on the event loop
+  thread (and read by the async /metrics route on the same thread), so
+  plain dict and list increments are safe without locks;
+- SQL statements are tallied by engine event listeners into the request's
+  own RequestStats, carried in a ContextVar (the threadpool inherits it),
+  and folded into the shared histograms when the request finishes;
+- numbers owned by other components (threadpool usage, cache hit counts)
+  are only read at scrape time.
+
+Routes are labelled by their path template (/social/{post_id}/like), or the
+mount path for mounted apps, never the raw path, so label cardinality stays
+bounded; requests that match nothing share the "unmatched" label.
+"""
+import math
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import anyio.to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Sample = Tuple[str, Sequence[Tuple[str, str]], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self.values.items():
+            yield self.name, tuple(zip(self.labelnames, labels)), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, labels: tuple, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # `le` is inclusive, hence bisect_left
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, series in self.series.items():
+            labelled = tuple(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                yield f"{self.name}_bucket", (*labelled, ("le", _format_value(float(bound)))), cumulative
+            yield f"{self.name}_sum", labelled, series[-1]
+            yield f"{self.name}_count", labelled, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        # Called at scrape time; return freshly filled metrics
+        self.collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics.extend(collector())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"),
+))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to serve a request, until the last body chunk is sent.", ("method", "route"),
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served.",
+))
+DB_STATEMENTS = REGISTRY.register(Histogram(
+    "http_request_db_statements", "SQL statements executed per request.", ("method", "route"), DB_STATEMENT_BUCKETS,
+))
+DB_DURATION = REGISTRY.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per request.", ("method", "route"),
+))
+IN_FLIGHT.set((), 0)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and their execution time against the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += time.perf_counter() - conn.info.pop("metrics_start", time.perf_counter())
+
+
+def route_label(scope: Scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (e.g. /uploads) extend root_path with their mount path
+    return scope.get("root_path", "")[len(root_path):] or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # unless a response starts before an exception
+        root_path = scope.get("root_path", "")
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        IN_FLIGHT.values[()] += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.values[()] -= 1
+            _request_stats.reset(token)
+            labels = (scope["method"], route_label(scope, root_path))
+            REQUESTS.inc((*labels, status))
+            REQUEST_DURATION.observe(labels, elapsed)
+            DB_STATEMENTS.observe(labels, stats.statements)
+            DB_DURATION.observe(labels, stats.db_seconds)
+
+
+def _threadpool_metrics() -> Iterable[Metric]:
+    # Sync endpoints and dependencies run on anyio's default limiter
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    metrics = (
+        Gauge("threadpool_threads_limit", "Threads available to sync endpoints."),
+        Gauge("threadpool_threads_busy", "Threads currently running sync work."),
+        Gauge("threadpool_tasks_waiting", "Sync calls waiting for a free thread."),
+    )
+    values = (limiter.total_tokens, limiter.borrowed_tokens, limiter.statistics().tasks_waiting)
+    for metric, value in zip(metrics, values):
+        metric.set((), value)
+    return metrics
+
+REGISTRY.add_collector(_threadpool_metrics)
+
+_caches: Dict[str, Callable[[], dict]] = {}
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    """Expose a TTLCache-style stats() (hits, misses, size, maxsize) under cache=name."""
+    _caches[name] = stats
+
+def _cache_metrics() -> Iterable[Metric]:
+    hits = Counter("cache_hits_total", "Cache lookups that found a live entry.", ("cache",))
+    misses = Counter("cache_misses_total", "Cache lookups that found nothing or an expired entry.", ("cache",))
+    size = Gauge("cache_entries", "Entries currently cached.", ("cache",))
+    maxsize = Gauge("cache_max_entries", "Cache capacity.", ("cache",))
+    for name, stats in _caches.items():
+        values = stats()
+        hits.inc((name,), values["hits"])
+        misses.inc((name,), values["misses"])
+        size.set((name,), values["size"])
+        maxsize.set((name,), values["maxsize"])
+    return hits, misses, size, maxsize
+
+REGISTRY.add_collector(_cache_metrics)
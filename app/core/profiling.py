@@ -0,0 +1,247 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A request is profiled when it carries "X-Profile: <PROFILING_TOKEN>", or at
+random with probability PROFILING_SAMPLE_RATE. While at least one profiled
+request is in flight, a background thread snapshots every thread's stack
+each interval (sys._current_frames) and keeps the samples that belong to a
+profiled request:
+- on the event loop thread, when that request's task is the one running;
+- on threadpool workers, while they run the sync endpoint of a profiled
+  request. Routers use ProfiledRoute, which wraps sync endpoints so the
+  worker thread registers the request's profile (read from the context
+  the threadpool copied) for the duration of the call. Sync dependencies
+  are not wrapped, so their worker time is not attributed.
+
+Profiles are kept in memory (newest PROFILING_MAX_PROFILES) as collapsed
+stacks, one "root;...;leaf count" line per distinct stack, the input format
+of flamegraph.pl, speedscope and friends. The profiled response carries
+X-Profile-Id for fetching it from /admin/profiles/{id}.
+
+When neither the token nor a sample rate is configured the middleware is
+not installed at all; otherwise unprofiled requests pay one header scan.
+"""
+import asyncio
+import functools
+import hmac
+import inspect
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("current_profile", default=None)
+
+# code object -> "module:qualname"
+_frame_names: Dict[object, str] = {}
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = _frame_names.get(code)
+    if name is None:
+        name = _frame_names[code] = (
+            f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+        ).replace(";", ",")
+    return name
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+# thread id -> profile of the sync endpoint that thread is running
+_worker_profiles: Dict[int, "Profile"] = {}
+
+def _attributed(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(endpoint)
+    def run(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        thread_id = threading.get_ident()
+        _worker_profiles[thread_id] = profile
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            del _worker_profiles[thread_id]
+    run.profiled = True
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose sync endpoint attributes its threadpool time to the request's profile."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        # include_router() builds the route again from the already wrapped endpoint
+        sync = not inspect.iscoroutinefunction(endpoint) and not inspect.isgeneratorfunction(endpoint)
+        if sync and not getattr(endpoint, "profiled", False):
+            endpoint = _attributed(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class Profile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = datetime.now(timezone.utc)
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.task: Optional[asyncio.Task] = None
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Sampler:
+    """One background thread for all in-flight profiles, running only while there are any."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self._profiles: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> None:
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.get_running_loop()
+                self.loop_thread_id = threading.get_ident()
+            self._profiles[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> None:
+        # Holding the lock means no sampling pass is writing to the profile
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                self._sample(own_id)
+            time.sleep(self.interval)
+
+    def _sample(self, own_id: int) -> None:
+        running_task = asyncio.current_task(self.loop)
+        by_task = {profile.task: profile for profile in self._profiles.values()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if thread_id == self.loop_thread_id:
+                profile = by_task.get(running_task)
+            else:
+                profile = _worker_profiles.get(thread_id)
+            if profile is not None and profile.id in self._profiles:
+                profile.stacks[_collapse(frame)] += 1
+                profile.samples += 1
+
+
+class ProfileStore:
+    """Most recent profiles, oldest evicted first."""
+
+    def __init__(self, maxsize: int = 100):
+        self.maxsize = maxsize
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    def add(self, profile: Profile) -> None:
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.maxsize:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def summaries(self) -> List[dict]:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.sampler = Sampler(interval)
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    if hmac.compare_digest(value, self.token):
+                        return "header"
+                    break
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], trigger)
+        profile.task = asyncio.current_task()
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        token = _current_profile.set(profile)
+        self.sampler.start(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            self.sampler.stop(profile)
+            # Stored profiles must not keep the finished task (and its frames) alive
+            profile.task = None
+            _current_profile.reset(token)
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            self.store.add(profile)
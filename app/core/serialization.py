@@ -0,0 +1,29 @@
+"""
+Fast JSON responses for the hot list endpoints.
+
+FastAPI's default path validates the return value against response_model,
+dumps it to Python primitives and then encodes those with the stdlib json
+module. json_response validates once (from attributes, so ORM rows go in
+as-is) and lets pydantic-core write the bytes directly. Routes keep their
+response_model for the OpenAPI schema; returning a Response makes FastAPI
+skip its own pass.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def get_adapter(tp: Any) -> TypeAdapter:
+    # Building an adapter compiles its schema; do it once per type
+    return TypeAdapter(tp)
+
+def json_response(tp: Any, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    adapter = get_adapter(tp)
+    value = adapter.validate_python(content, from_attributes=True)
+    return Response(
+        adapter.dump_json(value),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
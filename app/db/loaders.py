@@ -0,0 +1,46 @@
+"""
+Request-scoped batch loading of users.
+
+A request gets one Session (get_db), so the loader lives in Session.info.
+Services hand it every user id they are about to touch (post owners,
+comment authors, notification senders); it resolves the ones it hasn't seen
+with a single WHERE id IN (...) and keeps the rows alive. Because the rows
+are then in the Session's identity map, plain many-to-one lazy loads
+(post.owner, comment.user, notification.sender) find them there and emit
+no SQL, so existing code and schemas need no changes.
+"""
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from app.models.user import User
+
+# Stay well under bind-parameter limits
+BATCH_SIZE = 500
+
+
+class UserLoader:
+    def __init__(self, db: Session):
+        self.db = db
+        # Strong references: the identity map itself only holds weak ones
+        self._users: Dict[int, User] = {}
+        self._missing: set[int] = set()
+
+    def load_many(self, user_ids: Iterable[Optional[int]]) -> Dict[int, User]:
+        """Users by id (unknown ids are left out), querying only unseen ids."""
+        ids = [uid for uid in dict.fromkeys(user_ids) if uid is not None]
+        unseen = [uid for uid in ids if uid not in self._users and uid not in self._missing]
+        for i in range(0, len(unseen), BATCH_SIZE):
+            batch = unseen[i:i + BATCH_SIZE]
+            for user in self.db.query(User).filter(User.id.in_(batch)):
+                self._users[user.id] = user
+            self._missing.update(uid for uid in batch if uid not in self._users)
+        return {uid: self._users[uid] for uid in ids if uid in self._users}
+
+    def load(self, user_id: int) -> Optional[User]:
+        return self.load_many([user_id]).get(user_id)
+
+
+def get_user_loader(db: Session) -> UserLoader:
+    loader = db.info.get("user_loader")
+    if loader is None:
+        loader = db.info["user_loader"] = UserLoader(db)
+    return loader
@@ -0,0 +1,249 @@
+"""
+Bulk seeding of a synthetic social graph, written straight into the database.
+
+Shapes follow what real social data looks like rather than uniform noise:
+- follows: out-degree is Pareto-distributed around avg_follows, and who gets
+  followed is Zipf-distributed, so a few accounts hold a large share of all
+  followers,
+- posts per user and likes / comments per post are Pareto-distributed (most
+  posts get little engagement, a few go viral),
+- a notification for every follow, and for every like and comment on
+  someone else's post, ~70% of them read,
+- posts.likes_count agrees with the likes table.
+
+The same seed always produces the same data. Every user is userN /
+userN@example.com with a verified email and the same password, hashed once.
+
+Rows are generated as tuples and written per table in chunks, parents before
+children: PostgreSQL gets COPY ... FROM STDIN, other databases the driver's
+executemany, both below the ORM and Core compilation layers. Secondary
+indexes are dropped for the load and rebuilt at the end, which is far
+cheaper than maintaining them row by row.
+"""
+import io
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.db import Base
+from app.core.security import get_password_hash
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.notification import Notification
+from app.models.post import Post
+from app.models.user import User
+
+DEFAULT_PASSWORD = "Benchmark1!"
+CHUNK_SIZE = 20_000
+
+COLUMNS = {
+    "users": ("id", "username", "email", "password_hash", "full_name", "bio", "is_email_verified", "created_at"),
+    "follows": ("follower_id", "following_id", "created_at"),
+    "posts": ("id", "user_id", "content_text", "caption", "likes_count", "created_at"),
+    "likes": ("user_id", "post_id", "created_at"),
+    "comments": ("user_id", "post_id", "comment_text", "created_at"),
+    "notifications": ("receiver_id", "sender_id", "type", "post_id", "is_read", "created_at"),
+}
+
+FIRST_NAMES = "Ada Alan Grace Linus Guido Barbara Ken Dennis Margaret Edsger Donald Frances Radia Tim Sophie Hedy".split()
+LAST_NAMES = "Lovelace Turing Hopper Torvalds Rossum Liskov Thompson Ritchie Hamilton Dijkstra Knuth Allen Perlman Berners Wilson Lamarr".split()
+WORDS = "the a to of and in is it you that was for on are with as they at be this have from or one had by word but not what all were we when your can said there use each which do how their if will up other about out many then them these so some would make like into time has look two more write go see number way could people than first water been call who now find long down day did get come made may part".split()
+
+DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def pareto(rng: random.Random, mean: float, alpha: float = 1.5, cap: Optional[int] = None) -> int:
+    # paretovariate(alpha) has mean alpha / (alpha - 1); rescale to `mean`
+    value = int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+    return min(value, cap) if cap is not None else value
+
+def sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+def _timestamp_formatter(suffix: str):
+    """
+    Epoch seconds -> 'YYYY-MM-DD HH:MM:SS<suffix>' (UTC), whole seconds like
+    the server_default timestamps. About twice as fast as formatting
+    datetimes, which adds up over millions of rows.
+    """
+    dates: Dict[int, str] = {}
+
+    def stamp(ts: float) -> str:
+        day, seconds = divmod(int(ts), DAY)
+        date = dates.get(day)
+        if date is None:
+            date = dates[day] = (EPOCH + timedelta(days=day)).strftime("%Y-%m-%d")
+        return "%s %02d:%02d:%02d%s" % (date, seconds // 3600, seconds // 60 % 60, seconds % 60, suffix)
+    return stamp
+
+def _copy_value(value) -> str:
+    # PostgreSQL COPY text format
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value)
+
+
+class BulkWriter:
+    """Buffers rows per table and writes each full buffer in one round trip."""
+
+    def __init__(self, conn: Connection, chunk_size: int = CHUNK_SIZE):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.use_copy = conn.dialect.name == "postgresql"
+        placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+        self.inserts = {
+            table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+            for table, columns in COLUMNS.items()
+        }
+        self.buffers: Dict[str, List[tuple]] = {table: [] for table in COLUMNS}
+        self.counts: Dict[str, int] = dict.fromkeys(COLUMNS, 0)
+
+    def add(self, table: str, row: tuple) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self._write(table)
+
+    def flush(self) -> None:
+        for table in self.buffers:
+            self._write(table)
+
+    def _write(self, table: str) -> None:
+        rows = self.buffers[table]
+        if not rows:
+            return
+        if self.use_copy:
+            data = io.StringIO("".join("\t".join(map(_copy_value, row)) + "\n" for row in rows))
+            cursor = self.conn.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN", data)
+            finally:
+                cursor.close()
+        else:
+            self.conn.exec_driver_sql(self.inserts[table], rows)
+        self.counts[table] += len(rows)
+        self.buffers[table] = []
+
+
+def prepare_schema(engine: Engine, reset: bool = False) -> None:
+    """Create the tables (dropping them first with reset); refuse to seed on top of existing users."""
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar():
+            raise ValueError("Database already has users; seed an empty database or reset it first")
+
+def populate(
+    engine: Engine,
+    users: int = 5000,
+    avg_follows: float = 50,
+    avg_posts: float = 10,
+    avg_likes: float = 20,
+    avg_comments: float = 2,
+    seed: int = 42,
+    password: str = DEFAULT_PASSWORD,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Fill the (empty) schema on `engine`. Returns rows written per table."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).timestamp()
+    password_hash = get_password_hash(password)  # once, not per user
+
+    if engine.dialect.name == "sqlite":
+        # The format SQLAlchemy itself stores DateTime columns in on SQLite
+        stamp = _timestamp_formatter("")
+    elif engine.dialect.name == "postgresql":
+        stamp = _timestamp_formatter("+00")
+    else:
+        stamp = lambda ts: EPOCH_UTC + timedelta(seconds=ts)
+
+    # Who gets followed: Zipf over a shuffled ranking, so popularity isn't tied to id
+    ranking = list(range(1, users + 1))
+    rng.shuffle(ranking)
+    popularity = list(itertools.accumulate(1 / rank ** 1.1 for rank in range(1, users + 1)))
+
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql("PRAGMA cache_size=-262144")  # 256 MiB for the unique-key B-trees
+        for index in indexes:
+            index.drop(conn)
+        writer = BulkWriter(conn, chunk_size)
+
+        for user_id in range(1, users + 1):
+            writer.add("users", (
+                user_id, f"user{user_id}", f"user{user_id}@example.com", password_hash,
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", sentence(rng, 0, 20) or None,
+                True, stamp(now - rng.uniform(90, 720) * DAY),
+            ))
+        writer.flush()
+
+        for follower_id in range(1, users + 1):
+            wanted = pareto(rng, avg_follows, cap=users // 2)
+            followees = set()
+            for _ in range(5):
+                if len(followees) >= wanted:
+                    break
+                followees.update(rng.choices(ranking, cum_weights=popularity, k=(wanted - len(followees)) * 2))
+            followees.discard(follower_id)
+            for following_id in itertools.islice(followees, wanted):
+                created_at = stamp(now - rng.random() * 90 * DAY)
+                writer.add("follows", (follower_id, following_id, created_at))
+                writer.add("notifications", (following_id, follower_id, "follow", None, rng.random() < 0.7, created_at))
+
+        # Posts carry their final likes_count, so pick engagement up front
+        post_id = 0
+        engagement = []  # (post_id, author_id, created_at, likes, comments)
+        for author_id in range(1, users + 1):
+            for _ in range(pareto(rng, avg_posts, cap=2000)):
+                post_id += 1
+                created_at = now - rng.random() * 90 * DAY
+                likes = pareto(rng, avg_likes, cap=users - 1)
+                engagement.append((post_id, author_id, created_at, likes, pareto(rng, avg_comments, cap=5000)))
+                writer.add("posts", (
+                    post_id, author_id, sentence(rng, 3, 60), sentence(rng, 0, 8) or None, likes, stamp(created_at),
+                ))
+        writer.flush()
+
+        for post_id, author_id, created_at, likes, comments in engagement:
+            for liker_id in rng.sample(range(1, users + 1), likes):
+                liked_at = stamp(created_at + rng.random() * 2 * DAY)
+                writer.add("likes", (liker_id, post_id, liked_at))
+                if liker_id != author_id:
+                    writer.add("notifications", (author_id, liker_id, "like", post_id, rng.random() < 0.7, liked_at))
+            for _ in range(comments):
+                commenter_id = rng.randint(1, users)
+                commented_at = stamp(created_at + rng.random() * 3 * DAY)
+                writer.add("comments", (commenter_id, post_id, sentence(rng, 1, 30), commented_at))
+                if commenter_id != author_id:
+                    writer.add("notifications", (author_id, commenter_id, "comment", post_id, rng.random() < 0.7, commented_at))
+        writer.flush()
+
+        for index in indexes:
+            index.create(conn)
+        if engine.dialect.name == "postgresql":
+            # Explicit ids bypassed the sequences; move them past the data
+            for table in ("users", "posts"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                ))
+    return writer.counts
+
+def dataset_size(engine: Engine) -> Dict[str, int]:
+    with engine.connect() as conn:
+        return {
+            model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar()
+            for model in (User, Follow, Post, Like, Comment, Notification)
+        }
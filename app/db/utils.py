@@ -0,0 +1,11 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+def dialect_insert(db: Session, model):
+    """
+    INSERT construct for the session's backend, so callers can use
+    on_conflict_do_nothing() / returning() on both PostgreSQL and SQLite (3.35+).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -1,16 +1,47 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import logging
 import traceback
-import os
+from contextlib import asynccontextmanager
+from app.core import metrics, profiling
+from app.core.compression import CompressionMiddleware
+from app.core.media import MediaFiles
 from app.api import auth, users, social, notifications, upload, ai
+from app.api import metrics as metrics_api, profiling as profiling_api
+from app.core.config import settings
+from app.services import (
+    file_service, ai_service, like_buffer_service, follow_graph_service, suggestion_service
+)
+from app.db.session import engine
+from app.services.file_service import UPLOAD_DIR
 
 # Setup basic logging to file
 logging.basicConfig(filename='backend_error.log', level=logging.ERROR)
 
-app = FastAPI(title="Social Media App API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ai_service = ai_service.create_ai_service()
+    if app.state.ai_service is not None:
+        metrics.register_cache("ai_bios", app.state.ai_service.cache.stats)
+    if settings.LIKE_WRITE_BEHIND:
+        like_buffer_service.start()
+    if settings.FOLLOW_GRAPH_INDEX:
+        await follow_graph_service.start()
+    suggestion_service.start()
+    file_service.start_release_sweeper()
+    yield
+    await file_service.stop_release_sweeper()
+    await suggestion_service.stop()
+    if settings.FOLLOW_GRAPH_INDEX:
+        await follow_graph_service.stop()
+    if settings.LIKE_WRITE_BEHIND:
+        await like_buffer_service.stop()
+    if app.state.ai_service is not None:
+        await app.state.ai_service.aclose()
+    file_service.shutdown_variant_pool()
+
+app = FastAPI(title="Social Media App API", lifespan=lifespan)
 
 # Expanded CORS Configuration
 app.add_middleware(
@@ -28,12 +59,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        exclude_paths=("/uploads",),
+    )
 
-# Serve static files (uploads)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+if settings.PROFILING_SAMPLE_RATE > 0 and not settings.PROFILING_TOKEN:
+    # Sampled profiles could never be read: /admin/profiles needs the token
+    raise ValueError("PROFILING_SAMPLE_RATE requires PROFILING_TOKEN")
+if settings.PROFILING_TOKEN:
+    app.state.profiles = profiling.ProfileStore(settings.PROFILING_MAX_PROFILES)
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        store=app.state.profiles,
+        token=settings.PROFILING_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL_MS / 1000,
+    )
+
+if settings.METRICS_ENABLED and not settings.METRICS_TOKEN:
+    # Never serve /metrics (query timings, cache stats) unauthenticated
+    raise ValueError("METRICS_ENABLED requires METRICS_TOKEN")
+# Outermost, so timings include compression
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    metrics.register_cache("suggestions", suggestion_service.cache_stats)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Serve static files (uploads). Stored URLs already carry the shard
+# directories (/uploads/ab/cd/<name>), so each request is a single lookup.
+app.mount(
+    "/uploads",
+    MediaFiles(directory=UPLOAD_DIR, accel_redirect=settings.MEDIA_ACCEL_REDIRECT),
+    name="uploads",
+)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -51,3 +115,7 @@ app.include_router(social.router, prefix="/social", tags=["social"])
 app.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 app.include_router(upload.router, prefix="/upload", tags=["upload"])
 app.include_router(ai.router, prefix="/ai", tags=["ai"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_api.router, tags=["monitoring"])
+if settings.PROFILING_TOKEN:
+    app.include_router(profiling_api.router, prefix="/admin/profiles", tags=["admin"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
@@ -10,7 +10,12 @@ class Post(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content_text = Column(Text, nullable=True)
     caption = Column(String, nullable=True)
-    media_url = Column(String, nullable=True)
+    # Indexed: file_service.release_upload looks up references by URL
+    media_url = Column(String, nullable=True, index=True)
+    # Set once the media's renditions exist, so reads never check the disk
+    media_variants_ready = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Maintained by like_post / unlike_post so reads don't count the likes table
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
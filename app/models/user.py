@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
@@ -11,10 +11,15 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     full_name = Column(String, nullable=True)
-    profile_picture_url = Column(String, nullable=True)
+    # Indexed: file_service.release_upload looks up references by URL
+    profile_picture_url = Column(String, nullable=True, index=True)
+    # Set once the picture's renditions exist, so reads never check the disk
+    profile_picture_variants_ready = Column(Boolean, nullable=False, default=False, server_default=false())
     bio = Column(String, nullable=True)
     is_email_verified = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by any change to the row; part of the ETags of everything that embeds a user
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     posts = relationship("Post", back_populates="owner")
     comments = relationship("Comment", back_populates="user")
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: Optional[str] = None
+    status: Optional[int] = None
+    trigger: str
+    started_at: datetime
+    duration_ms: float
+    samples: int
@@ -1,8 +1,13 @@
-from pydantic import BaseModel, model_validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator, computed_field
+from typing import Optional, List, Dict
 from datetime import datetime
+from app.core.media import variant_urls
 from app.schemas.user import UserPublic
 
+# --- Discovery ---
+class SuggestedUser(UserPublic):
+    mutual_follows_count: int # How many people you follow also follow them
+
 # --- Post Schemas ---
 class PostBase(BaseModel):
     content_text: Optional[str] = None
@@ -21,19 +26,34 @@ class PostUpdate(BaseModel):
     caption: Optional[str] = None
     media_url: Optional[str] = None
 
-class Post(PostBase):
+class PostRef(PostBase):
+    # A post that points at its owner by user_id only (normalized lists)
     id: int
     user_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    owner: UserPublic
     likes_count: int = 0
     comments_count: int = 0
     is_liked_by_me: bool = False # Helper for UI
+    media_variants_ready: bool = Field(default=False, exclude=True)
+
+    @computed_field
+    @property
+    def media_variants(self) -> Optional[Dict[str, str]]:
+        # thumbnail / feed / full renditions; the original URL until they are ready
+        return variant_urls(self.media_url, self.media_variants_ready)
 
     class Config:
         from_attributes = True
 
+class Post(PostRef):
+    owner: UserPublic
+
+class PostPage(BaseModel):
+    # Normalized list: each owner is sent once, posts refer to it by user_id
+    posts: List[PostRef]
+    users: List[UserPublic]
+
 # --- Comment Schemas ---
 
 class CommentBase(BaseModel):
@@ -57,6 +77,12 @@ class Comment(CommentBase):
 class LikeCreate(BaseModel):
     post_id: int
 
+class CommentPage(BaseModel):
+    comments: List[Comment]
+    next_cursor: Optional[str] = None # Pass as ?cursor= for the next page; None at the end
+
 class PostDetail(Post):
-    comments: List[Comment] = []
+    # First page only (oldest first); fetch the rest from /{post_id}/comments
+    comments: List[Comment] = Field(default=[], validation_alias="comments_page")
+    comments_next_cursor: Optional[str] = None
 
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int # Total size in bytes
+
+class UploadSession(BaseModel):
+    id: str
+    filename: str
+    size: int
+    offset: int # Bytes received so far; the next PUT must start here
+    expires_at: datetime # Removed if nothing is written until then; each chunk extends it
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import Optional, Dict, List, Literal
 from datetime import datetime
+from app.core.media import variant_urls
 
 class UserBase(BaseModel):
     username: str
@@ -42,10 +43,38 @@ class UserPublic(BaseModel):
     created_at: datetime
     followers_count: int = 0
     following_count: int = 0
+    profile_picture_variants_ready: bool = Field(default=False, exclude=True)
+
+    @computed_field
+    @property
+    def profile_picture_variants(self) -> Optional[Dict[str, str]]:
+        # thumbnail / feed / full renditions; the original URL until they are ready
+        return variant_urls(self.profile_picture_url, self.profile_picture_variants_ready)
 
     class Config:
         from_attributes = True
 
+class UserWithRelationship(UserPublic):
+    # Relative to the requesting user; only filled when asked for
+    is_following: Optional[bool] = None
+    is_followed_by: Optional[bool] = None
+
+# --- Relationships ---
+class RelationshipQuery(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class Relationship(BaseModel):
+    user_id: int
+    following: bool # I follow them
+    followed_by: bool # They follow me
+
+class BulkFollowRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class BulkFollowResult(BaseModel):
+    user_id: int
+    status: Literal["followed", "already_following", "not_found", "self"]
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -1,38 +1,306 @@
-from typing import List
-from groq import Groq
-from fastapi import HTTPException, status
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from groq import AsyncGroq
+from fastapi import HTTPException, Request, status
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 
+def normalize_keywords(keywords: str) -> str:
+    """
+    Canonical form used as the cache key: "Traveler, photographer,traveler"
+    and "photographer, traveler" both become "photographer, traveler".
+    """
+    parts = {part.strip().lower() for part in keywords.split(",")}
+    return ", ".join(sorted(part for part in parts if part))
+
+
+class BioStreamParser:
+    """
+    Incremental parser for a streamed JSON array of strings. feed() takes
+    arbitrary text fragments and returns the elements whose closing quote
+    has arrived, so each bio can be sent before the array is complete.
+    Text outside string literals (the brackets, commas, stray prose) is ignored.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._in_string = False
+        self._escaped = False
+        self._buffer: List[str] = []
+
+    def feed(self, text: str) -> List[str]:
+        completed = []
+        for char in text:
+            if not self._in_array:
+                self._in_array = char == "["
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    self._buffer.append(char)
+                elif char == "\\":
+                    self._escaped = True
+                    self._buffer.append(char)
+                elif char == '"':
+                    self._in_string = False
+                    raw = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        completed.append(json.loads(f'"{raw}"'))
+                    except json.JSONDecodeError:
+                        continue
+                else:
+                    self._buffer.append(char)
+            elif char == '"':
+                self._in_string = True
+            elif char == "]":
+                self._in_array = False
+        return completed
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive upstream failures. After
+    `reset_timeout` seconds one trial call is let through (half-open); its
+    outcome closes the breaker again or re-opens it.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_progress = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_progress:
+            self._trial_in_progress = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_progress = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """The allowed call ended with no verdict (cancelled): let another one be the trial."""
+        self._trial_in_progress = False
+
+
 class GroqAIService:
     """Service for Groq AI interactions"""
-    
-    def __init__(self):
-        if not settings.GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY not configured")
-        
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+
+    def __init__(self, client: Optional[Any] = None):
+        if client is None:
+            if not settings.GROQ_API_KEY:
+                raise ValueError("GROQ_API_KEY not configured")
+            # Retries and deadlines are handled here, not by the SDK
+            client = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                timeout=settings.AI_TIMEOUT_SECONDS,
+                max_retries=0,
+            )
+
+        self.client = client
         self.model = "llama-3.3-70b-versatile"
-    
-    def generate_bio_suggestions(self, keywords: str, count: int = 3) -> List[str]:
+
+        # Identical keyword sets share one answer for a while...
+        self.cache = TTLCache(maxsize=settings.AI_CACHE_SIZE, ttl=settings.AI_CACHE_TTL_SECONDS)
+        # ...and concurrent identical requests share one upstream call
+        self._in_flight: Dict[tuple, asyncio.Task] = {}
+
+        # Bounds how much of this worker the AI endpoint can ever occupy
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(settings.AI_BREAKER_THRESHOLD, settings.AI_BREAKER_RESET_SECONDS)
+        self.deadline = settings.AI_TIMEOUT_SECONDS
+        self.hedge_delay = settings.AI_HEDGE_DELAY_SECONDS
+
+        self.coalesced = 0
+        self.hedges = 0
+        self.rejected = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_seconds_total = 0.0
+        self.upstream_seconds_max = 0.0
+        self.streams = 0
+        self.streams_with_bio = 0
+        self.first_bio_seconds_total = 0.0
+
+    async def aclose(self) -> None:
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+    async def generate_bio_suggestions(self, keywords: str, count: int = 3) -> List[str]:
         """
         Generate creative bio suggestions based on user keywords.
-        
+
         Args:
             keywords: User-provided keywords (e.g., "photographer, traveler, coffee lover")
             count: Number of suggestions to generate
-            
+
         Returns:
             List of bio suggestion strings
         """
+        normalized = self.validate_keywords(keywords)
+        key = (normalized, count)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # Its own task, owned by no request: whoever started it can
+            # disconnect without failing the others waiting on it
+            task = asyncio.create_task(self._request_bios(normalized, count))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._call_finished(key, done))
+        # shield: a waiter being cancelled must not cancel the shared call
+        return list(await asyncio.shield(task))
+
+    def _call_finished(self, key: tuple, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved: every waiter may have gone before it failed
+            task.exception()
+
+    def validate_keywords(self, keywords: str) -> str:
+        """Reject too-short input; returns the normalized keywords."""
         if not keywords or len(keywords.strip()) < 3:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Please provide at least a few keywords to generate a bio."
             )
-        
+        return normalize_keywords(keywords) or keywords.strip().lower()
+
+    async def stream_bio_suggestions(self, keywords: str, count: int = 3) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Streaming variant of generate_bio_suggestions. Yields ("token", text)
+        as the model produces output and ("bio", bio) as soon as each array
+        element is complete. Cached answers are yielded immediately.
+        Upstream failures are raised as HTTPException, like the non-streaming path.
+        """
+        normalized = self.validate_keywords(keywords)
+        key = (normalized, count)
+        started = time.perf_counter()
+        first_bio_recorded = False
+
+        def record_first_bio():
+            nonlocal first_bio_recorded
+            if not first_bio_recorded:
+                first_bio_recorded = True
+                self.streams_with_bio += 1
+                self.first_bio_seconds_total += time.perf_counter() - started
+
+        self.streams += 1
+        cached = self.cache.get(key)
+        if cached is not None:
+            for bio in cached:
+                record_first_bio()
+                yield "bio", bio
+            return
+
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="AI bio generation is temporarily unavailable. Please try again shortly."
+            )
+
+        # The upstream stream is read by its own task, so the concurrency slot
+        # and the deadline cover the model and not how fast the client reads
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        pump = asyncio.create_task(self._pump_stream(self._build_prompt(normalized, count), queue))
+        pump.add_done_callback(self._stream_finished)
+        parser = BioStreamParser()
+        bios: List[str] = []
+        try:
+            while (text := await queue.get()) is not None:
+                yield "token", text
+                for bio in parser.feed(text):
+                    bio = bio.strip()
+                    if bio and len(bios) < count:
+                        bios.append(bio)
+                        record_first_bio()
+                        yield "bio", bio
+            await pump
+        except TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="AI bio generation timed out."
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI bio generation failed: {str(e)}"
+            )
+        finally:
+            # Client gone (GeneratorExit / cancellation): stop reading upstream
+            pump.cancel()
+
+        if bios:
+            self.cache.set(key, tuple(bios))
+        else:
+            # Same fallback as the non-streaming path
+            yield "bio", f"✨ {normalized.title()} enthusiast"
+
+    async def _pump_stream(self, prompt: str, queue: "asyncio.Queue[Optional[str]]") -> None:
+        # Feeds the streamed text into `queue`; None marks the end, whatever the outcome
         try:
-            prompt = f"""Generate {count} creative, engaging social media bios based on these keywords: {keywords}
+            async with self._semaphore, asyncio.timeout(self.deadline):
+                self.upstream_calls += 1
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    max_tokens=500,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,  # Higher for creativity
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        queue.put_nowait(chunk.choices[0].delta.content)
+        finally:
+            queue.put_nowait(None)
+
+    def _stream_finished(self, pump: asyncio.Task) -> None:
+        # Breaker bookkeeping for a stream, including ones whose client left
+        if pump.cancelled():
+            self.breaker.release()
+        elif pump.exception() is not None:
+            self.upstream_errors += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _build_prompt(self, keywords: str, count: int) -> str:
+        return f"""Generate {count} creative, engaging social media bios based on these keywords: {keywords}
 
 Requirements:
 - Each bio should be 1-2 sentences max (under 150 characters preferred)
@@ -43,29 +311,107 @@ Requirements:
 Return ONLY a JSON array of strings, no other text. Example format:
 ["Bio 1 here ✨", "Bio 2 here 🚀", "Bio 3 here 💡"]"""
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=500,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8  # Higher for creativity
+    async def _complete(self, prompt: str) -> str:
+        # One upstream attempt, holding a concurrency slot for its duration
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.upstream_calls += 1
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    max_tokens=500,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8  # Higher for creativity
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.upstream_errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.upstream_seconds_total += elapsed
+                self.upstream_seconds_max = max(self.upstream_seconds_max, elapsed)
+        return response.choices[0].message.content.strip()
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[str]]) -> str:
+        """
+        Run `attempt` under the hard deadline. If it has not answered after
+        hedge_delay, or fails, a second attempt is started; the first success
+        wins and the loser is cancelled.
+        """
+        tasks = {asyncio.create_task(attempt())}
+        hedges_left = 1
+        last_error: Optional[BaseException] = None
+        try:
+            async with asyncio.timeout(self.deadline):
+                while tasks:
+                    done, _ = await asyncio.wait(
+                        tasks,
+                        timeout=self.hedge_delay if hedges_left else None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        tasks.discard(task)
+                        if task.exception() is None:
+                            return task.result()
+                        last_error = task.exception()
+                    # Slow (nothing done) or failed with nothing left running
+                    if hedges_left and (not done or not tasks):
+                        hedges_left -= 1
+                        self.hedges += 1
+                        tasks.add(asyncio.create_task(attempt()))
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise last_error
+
+    async def _request_bios(self, keywords: str, count: int) -> List[str]:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="AI bio generation is temporarily unavailable. Please try again shortly."
+            )
+
+        prompt = self._build_prompt(keywords, count)
+        try:
+            response_text = await self._hedged(lambda: self._complete(prompt))
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except TimeoutError:
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="AI bio generation timed out."
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"AI bio generation failed: {str(e)}"
             )
-            
-            response_text = response.choices[0].message.content.strip()
-            
+        self.breaker.record_success()
+
+        try:
             # Parse JSON response
-            import json
             bios = json.loads(response_text)
-            
+
             # Validate
             if not isinstance(bios, list):
                 raise ValueError("Invalid response format")
-            
+
             bios = [bio.strip() for bio in bios if isinstance(bio, str) and bio.strip()]
-            
-            return bios[:count]
-            
+            bios = bios[:count]
+
+            # Only well-formed answers are worth caching
+            if bios:
+                self.cache.set((keywords, count), tuple(bios))
+            return bios
+
         except json.JSONDecodeError:
             # If JSON parsing fails, try to extract bios manually
             return [f"✨ {keywords.title()} enthusiast"]
@@ -75,13 +421,45 @@ Return ONLY a JSON array of strings, no other text. Example format:
                 detail=f"AI bio generation failed: {str(e)}"
             )
 
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit rate and upstream latency, for monitoring."""
+        calls = self.upstream_calls
+        return {
+            "cache": self.cache.stats(),
+            "coalesced_requests": self.coalesced,
+            "circuit_breaker": self.breaker.state,
+            "rejected_requests": self.rejected,
+            "streaming": {
+                "requests": self.streams,
+                "avg_time_to_first_bio_ms": (
+                    self.first_bio_seconds_total / self.streams_with_bio * 1000
+                ) if self.streams_with_bio else 0.0,
+            },
+            "upstream": {
+                "calls": calls,
+                "hedged_calls": self.hedges,
+                "errors": self.upstream_errors,
+                "avg_latency_ms": (self.upstream_seconds_total / calls * 1000) if calls else 0.0,
+                "max_latency_ms": self.upstream_seconds_max * 1000,
+            },
+        }
+
+
+# --- Lifecycle ---
+# Created in the app lifespan (one per worker process) and closed on shutdown.
 
-# Singleton instance
-_ai_service = None
+def create_ai_service() -> Optional[GroqAIService]:
+    """Build the service, or None when GROQ_API_KEY is not configured."""
+    if not settings.GROQ_API_KEY:
+        return None
+    return GroqAIService()
 
-def get_ai_service() -> GroqAIService:
-    """Get or create the AI service singleton"""
-    global _ai_service
-    if _ai_service is None:
-        _ai_service = GroqAIService()
-    return _ai_service
+def get_ai_service(request: Request) -> GroqAIService:
+    """Dependency returning the app's AI service"""
+    ai_service = getattr(request.app.state, "ai_service", None)
+    if ai_service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is not configured."
+        )
+    return ai_service
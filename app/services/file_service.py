@@ -1,53 +1,390 @@
 import os
+import time
 import uuid
+import asyncio
+import hashlib
+import logging
+import shutil
+import tempfile
+import threading
 import aiofiles
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from starlette.formparsers import MultiPartParser
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.media import IMAGE_EXTENSIONS, VARIANTS, variant_url, variant_urls
+from app.db.session import SessionLocal
+from app.models.post import Post
+from app.models.user import User
 
 UPLOAD_DIR = "uploads"
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp4", ".mov"}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+# Unreferenced files younger than this are kept: the uploader may not have
+# created the post / profile update that points at them yet.
+ORPHAN_GRACE_SECONDS = 60 * 60
+# How often releases deferred by the grace period are retried
+RELEASE_SWEEP_SECONDS = 5 * 60
+
+VARIANT_QUALITY = 80
+
+_variant_pool: Optional[ProcessPoolExecutor] = None
+# URLs whose renditions are known to exist, so we stat each file only once
+_ready_variants: set[str] = set()
+
+# url -> time it leaves the grace period. Kept in memory, so a restart
+# forgets pending releases; those files just stay until released again.
+_deferred_releases: Dict[str, float] = {}
+_deferred_lock = threading.Lock()
+_release_sweeper: Optional[asyncio.Task] = None
+
+logger = logging.getLogger(__name__)
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-async def save_upload_file(file: UploadFile) -> tuple[str, str]:
-    # Validate file extension
-    ext = os.path.splitext(file.filename)[1].lower()
+def shard_dir(filename: str) -> str:
+    """
+    Two-level prefix directory for a stored file, e.g. "d0/36" for
+    "d036eecd....png". Names are hex digests (or legacy uuids), so this
+    spreads files evenly over 65536 directories.
+    """
+    return f"{filename[:2]}/{filename[2:4]}"
+
+def url_for(filename: str) -> str:
+    return f"/uploads/{shard_dir(filename)}/{filename}"
+
+def path_for_url(file_url: str) -> str:
+    # Works for both sharded and legacy flat URLs
+    relative = file_url[len("/uploads/"):]
+    return os.path.join(UPLOAD_DIR, *relative.split("/"))
+
+def variants_exist(file_url: Optional[str]) -> bool:
+    """
+    Whether the renditions of an uploaded image are on disk. Used when a row
+    starts referencing a file; reads use the flag stored on the row.
+    """
+    if not file_url or os.path.splitext(file_url)[1].lower() not in IMAGE_EXTENSIONS:
+        return False
+    if file_url in _ready_variants:
+        return True
+    # "full" is written last, so its presence means the set is complete
+    if not file_url.startswith("/uploads/") or not os.path.exists(path_for_url(variant_url(file_url, "full"))):
+        return False
+    _ready_variants.add(file_url)
+    return True
+
+def get_variant_urls(file_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """Rendition URLs for a file not stored on any row yet (the upload response)."""
+    return variant_urls(file_url, variants_exist(file_url))
+
+def mark_variants_ready(db: Session, file_url: str) -> None:
+    """Flag every post and profile picture that uses `file_url` as rendered."""
+    # Post.updated_at is left alone: a finished render is not an edit
+    db.execute(
+        update(Post)
+        .where(Post.media_url == file_url, Post.media_variants_ready.is_(False))
+        .values(media_variants_ready=True, updated_at=Post.updated_at),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        update(User)
+        .where(User.profile_picture_url == file_url, User.profile_picture_variants_ready.is_(False))
+        .values(profile_picture_variants_ready=True),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+
+def settle_variants(db: Session, file_url: Optional[str]) -> None:
+    """
+    Call after committing a row that references `file_url` with its flag
+    unset: a render that finished before the commit could not see the row.
+    """
+    if variants_exist(file_url):
+        mark_variants_ready(db, file_url)
+
+def _render_variants(source_path: str, targets: list[tuple[str, int]]) -> None:
+    # Runs in a worker process: decoding and resizing are CPU-bound
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        for target_path, size in targets:
+            rendition = image.copy()
+            rendition.thumbnail((size, size), Image.Resampling.LANCZOS)
+            temp_path = f"{target_path}.tmp"
+            rendition.save(temp_path, "WEBP", quality=VARIANT_QUALITY, method=4)
+            os.replace(temp_path, target_path)
+
+def get_variant_pool() -> ProcessPoolExecutor:
+    global _variant_pool
+    if _variant_pool is None:
+        _variant_pool = ProcessPoolExecutor(max_workers=settings.MEDIA_WORKERS)
+    return _variant_pool
+
+def shutdown_variant_pool() -> None:
+    global _variant_pool
+    if _variant_pool is not None:
+        _variant_pool.shutdown(wait=True, cancel_futures=True)
+        _variant_pool = None
+
+async def generate_variants(file_url: str) -> None:
+    """
+    Render the thumbnail/feed/full WebP renditions of an uploaded image in the
+    process pool. Meant to run as a background task after the upload response.
+    """
+    if os.path.splitext(file_url)[1].lower() not in IMAGE_EXTENSIONS or variants_exist(file_url):
+        return
+
+    # Ordered so that "full" is written last (see variants_exist)
+    targets = [
+        (path_for_url(variant_url(file_url, name)), size)
+        for name, size in sorted(VARIANTS.items(), key=lambda item: item[0] == "full")
+    ]
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(get_variant_pool(), _render_variants, path_for_url(file_url), targets)
+    except Exception:
+        # Clients keep getting the original; nothing else to do
+        logger.exception("Failed to render variants for %s", file_url)
+        return
+    _ready_variants.add(file_url)
+    try:
+        await run_in_threadpool(_mark_variants_ready, file_url)
+    except Exception:
+        logger.exception("Failed to flag variants of %s as ready", file_url)
+
+def _mark_variants_ready(file_url: str) -> None:
+    db = SessionLocal()
+    try:
+        mark_variants_ready(db, file_url)
+    finally:
+        db.close()
+
+def validate_extension(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"File type not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
+    return ext
+
+def store_file(temp_path: str, ext: str, hexdigest: str) -> tuple[str, str]:
+    """
+    Move a fully written temp file into the content-addressed store.
+    Returns (url, filename); the temp file is consumed either way.
+    """
+    unique_filename = f"{hexdigest}{ext}"
+    file_url = url_for(unique_filename)
+    file_path = path_for_url(file_url)
+
+    if os.path.exists(file_path):
+        # Same bytes already stored: drop the copy, refresh the mtime so the
+        # existing file gets a new grace period in release_upload.
+        os.remove(temp_path)
+        os.utime(file_path)
+    else:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.replace(temp_path, file_path)
+
+    return file_url, unique_filename
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)} MB"
+    )
+
+def _copy_fd(src_fd: int, dst_fd: int, size: int) -> None:
+    # Kernel-side copy: copy_file_range (reflink/server-side copy where the
+    # filesystem supports it), then sendfile, then a plain read/write loop.
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+            if copied == 0:
+                break
+            offset += copied
+    except (AttributeError, OSError):
+        pass
+    if offset >= size:
+        return
+    try:
+        while offset < size:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            copied = os.sendfile(dst_fd, src_fd, offset, size - offset)
+            if copied == 0:
+                break
+            offset += copied
+    except (AttributeError, OSError):
+        pass
+    if offset >= size:
+        return
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while chunk := os.read(src_fd, 1024 * 1024):
+        os.write(dst_fd, chunk)
+
+def _finalize_spooled(file: UploadFile, ext: str) -> tuple[str, str]:
+    """
+    Store an upload Starlette has already spooled. The digest is computed
+    straight from the spool. Bodies over Starlette's spool threshold live
+    in a temp file and are copied by the kernel; smaller ones are still in
+    memory and are written once. If the digest is already stored nothing
+    is written at all.
+    """
+    source = file.file
+    size = source.seek(0, os.SEEK_END)
+    if size > MAX_FILE_SIZE:
+        raise _too_large()
+    source.seek(0)
+    hexdigest = hashlib.file_digest(source, "sha256").hexdigest()
+
+    unique_filename = f"{hexdigest}{ext}"
+    file_url = url_for(unique_filename)
+    if os.path.exists(path_for_url(file_url)):
+        os.utime(path_for_url(file_url))
+        return file_url, unique_filename
+
+    temp_path = os.path.join(UPLOAD_DIR, f".tmp-{uuid.uuid4()}{ext}")
+    try:
+        with open(temp_path, "wb") as out_file:
+            # Either branch works whatever the spool's state; the size only
+            # picks the cheaper one (fileno() would roll a memory spool to disk)
+            if size > MultiPartParser.spool_max_size:
+                _copy_fd(source.fileno(), out_file.fileno(), size)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, out_file)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise HTTPException(status_code=500, detail="Error saving file")
+
+    return store_file(temp_path, ext, hexdigest)
+
+async def _stream_to_store(file: UploadFile, ext: str) -> tuple[str, str]:
+    # Write to a temp name first; the final name is the content digest,
+    # which we only know once the whole stream has been read.
+    temp_path = os.path.join(UPLOAD_DIR, f".tmp-{uuid.uuid4()}{ext}")
+    digest = hashlib.sha256()
+
     # Save file using aiofiles with chunk streaming
     byte_count = 0
     try:
-        async with aiofiles.open(file_path, "wb") as out_file:
+        async with aiofiles.open(temp_path, "wb") as out_file:
             while chunk := await file.read(1024 * 1024):  # Read in 1MB chunks
                 byte_count += len(chunk)
                 if byte_count > MAX_FILE_SIZE:
                     # Clean up the partial file
                     await out_file.close() # Close before deleting
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)} MB"
-                    )
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise _too_large()
+                digest.update(chunk)
                 await out_file.write(chunk)
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         # Cleanup on other errors
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         raise HTTPException(status_code=500, detail="Error saving file")
-    
-    # Return the URL
-    file_url = f"/uploads/{unique_filename}"
-    
-    return file_url, unique_filename
+
+    return store_file(temp_path, ext, digest.hexdigest())
+
+async def save_upload_file(file: UploadFile) -> tuple[str, str]:
+    # Validate file extension
+    ext = validate_extension(file.filename)
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    # Multipart bodies arrive spooled; anything else is streamed
+    if isinstance(file.file, tempfile.SpooledTemporaryFile):
+        return await run_in_threadpool(_finalize_spooled, file, ext)
+    return await _stream_to_store(file, ext)
+
+def is_referenced(db: Session, file_url: str) -> bool:
+    """
+    Whether any row points at an uploaded file. Storage is content-addressed,
+    so one file can back many posts and profile pictures.
+    """
+    return db.execute(select(
+        exists().where(Post.media_url == file_url) | exists().where(User.profile_picture_url == file_url)
+    )).scalar()
+
+def release_upload(db: Session, file_url: Optional[str]) -> bool:
+    """
+    Delete an uploaded file once nothing references it any more.
+    Call after the referencing row has been removed or repointed and committed.
+    Files still inside their grace period are queued for the release sweeper.
+    """
+    if not file_url or not file_url.startswith("/uploads/") or ".." in file_url:
+        return False
+
+    file_path = path_for_url(file_url)
+    if not os.path.exists(file_path):
+        return False
+    release_at = os.path.getmtime(file_path) + ORPHAN_GRACE_SECONDS
+    if time.time() < release_at:
+        with _deferred_lock:
+            _deferred_releases[file_url] = release_at
+        return False
+    if is_referenced(db, file_url):
+        return False
+
+    os.remove(file_path)
+    for name in VARIANTS:
+        variant_path = path_for_url(variant_url(file_url, name))
+        if os.path.exists(variant_path):
+            os.remove(variant_path)
+    _ready_variants.discard(file_url)
+    return True
+
+def sweep_deferred_releases() -> int:
+    """Retry releases whose grace period is over. Returns the number of files deleted."""
+    now = time.time()
+    with _deferred_lock:
+        due = [url for url, release_at in _deferred_releases.items() if release_at <= now]
+        for url in due:
+            del _deferred_releases[url]
+    if not due:
+        return 0
+
+    db = SessionLocal()
+    try:
+        # A file re-uploaded meanwhile has a fresh mtime and is simply deferred again
+        return sum(release_upload(db, url) for url in due)
+    finally:
+        db.close()
+
+async def _release_sweep_loop() -> None:
+    while True:
+        await asyncio.sleep(RELEASE_SWEEP_SECONDS)
+        try:
+            await run_in_threadpool(sweep_deferred_releases)
+        except Exception:
+            logger.exception("Deferred upload release failed")
+
+def start_release_sweeper() -> None:
+    global _release_sweeper
+    if _release_sweeper is None:
+        _release_sweeper = asyncio.create_task(_release_sweep_loop())
+
+async def stop_release_sweeper() -> None:
+    global _release_sweeper
+    if _release_sweeper is not None:
+        _release_sweeper.cancel()
+        try:
+            await _release_sweeper
+        except asyncio.CancelledError:
+            pass
+        _release_sweeper = None
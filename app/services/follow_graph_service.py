@@ -0,0 +1,202 @@
+"""
+In-process index of the follow graph (settings.FOLLOW_GRAPH_INDEX).
+
+Each user with edges has two sorted array('i') adjacency lists, one for
+followers and one for following, i.e. CSR rows kept per node so they can be
+updated in place. Membership is a binary search (O(log d)), degree is len()
+(O(1)).
+
+Memory: every edge is stored twice as a 4-byte int, so 8 bytes per edge,
+plus roughly 150 bytes per user with at least one edge (two array headers
+and their dict slots). 10M edges over 1M users is about 230 MB.
+
+The index is built at startup with one streamed SELECT and kept current by
+follow_user / unfollow_user in this process. Other worker processes see a
+change after their next periodic rebuild (FOLLOW_GRAPH_REBUILD_SECONDS), so
+with several workers reads can be that stale. Writes still go to the
+database first; the index is only used for reads.
+"""
+import asyncio
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.follow import Follow
+
+_EMPTY = array("i")
+
+
+class FollowGraph:
+    def __init__(self):
+        self.followers: Dict[int, array] = {}
+        self.following: Dict[int, array] = {}
+        self.edges = 0
+
+    @staticmethod
+    def _contains(values: array, value: int) -> bool:
+        i = bisect_left(values, value)
+        return i < len(values) and values[i] == value
+
+    @staticmethod
+    def _insert(index: Dict[int, array], key: int, value: int) -> bool:
+        values = index.get(key)
+        if values is None:
+            index[key] = array("i", (value,))
+            return True
+        i = bisect_left(values, value)
+        if i < len(values) and values[i] == value:
+            return False
+        values.insert(i, value)
+        return True
+
+    @staticmethod
+    def _remove(index: Dict[int, array], key: int, value: int) -> bool:
+        values = index.get(key)
+        if values is None:
+            return False
+        i = bisect_left(values, value)
+        if i == len(values) or values[i] != value:
+            return False
+        del values[i]
+        if not values:
+            del index[key]
+        return True
+
+    def add_edge(self, follower_id: int, following_id: int) -> None:
+        if self._insert(self.following, follower_id, following_id):
+            self._insert(self.followers, following_id, follower_id)
+            self.edges += 1
+
+    def remove_edge(self, follower_id: int, following_id: int) -> None:
+        if self._remove(self.following, follower_id, following_id):
+            self._remove(self.followers, following_id, follower_id)
+            self.edges -= 1
+
+    def is_following(self, follower_id: int, following_id: int) -> bool:
+        return self._contains(self.following.get(follower_id, _EMPTY), following_id)
+
+    def followers_of(self, user_id: int) -> array:
+        return self.followers.get(user_id, _EMPTY)
+
+    def following_of(self, user_id: int) -> array:
+        return self.following.get(user_id, _EMPTY)
+
+    def follower_count(self, user_id: int) -> int:
+        return len(self.followers.get(user_id, _EMPTY))
+
+    def following_count(self, user_id: int) -> int:
+        return len(self.following.get(user_id, _EMPTY))
+
+    @classmethod
+    def build(cls, db: Session, batch_size: int = 50_000) -> "FollowGraph":
+        """Bulk load from the follows table in one ordered, streamed query."""
+        graph = cls()
+        rows = db.execute(
+            select(Follow.follower_id, Follow.following_id)
+            .order_by(Follow.follower_id, Follow.following_id)
+            .execution_options(yield_per=batch_size)
+        )
+        current_id, current = None, None
+        for follower_id, following_id in rows:
+            # Rows arrive sorted by (follower, following): append, no searching
+            if follower_id != current_id:
+                current_id, current = follower_id, array("i")
+                graph.following[follower_id] = current
+            current.append(following_id)
+            reverse = graph.followers.get(following_id)
+            if reverse is None:
+                graph.followers[following_id] = array("i", (follower_id,))
+            else:
+                reverse.append(follower_id)
+            graph.edges += 1
+        # Follower ids arrive in ascending order per target too, since the
+        # scan is ordered by follower_id; nothing to sort.
+        return graph
+
+    def memory_bytes(self) -> int:
+        payload = sum(v.buffer_info()[1] * v.itemsize for v in self.followers.values())
+        payload += sum(v.buffer_info()[1] * v.itemsize for v in self.following.values())
+        return payload
+
+
+# --- Module-level index used by the services ---
+
+_graph: Optional[FollowGraph] = None
+_write_lock = threading.Lock()
+# Edge changes made while a rebuild is running, replayed onto the new graph
+_journal: Optional[List[Tuple[bool, int, int]]] = None
+_rebuilder: Optional[asyncio.Task] = None
+
+logger = logging.getLogger(__name__)
+
+def get_graph() -> Optional[FollowGraph]:
+    """The loaded index, or None when disabled / not built yet (callers fall back to SQL)."""
+    return _graph
+
+def rebuild(db: Session) -> FollowGraph:
+    global _graph, _journal
+    with _write_lock:
+        _journal = []
+    graph = FollowGraph.build(db)
+    with _write_lock:
+        for added, follower_id, following_id in _journal:
+            if added:
+                graph.add_edge(follower_id, following_id)
+            else:
+                graph.remove_edge(follower_id, following_id)
+        _journal = None
+        _graph = graph
+    return graph
+
+def add_edge(follower_id: int, following_id: int) -> None:
+    # Call after the follow has been committed
+    with _write_lock:
+        if _journal is not None:
+            _journal.append((True, follower_id, following_id))
+        if _graph is not None:
+            _graph.add_edge(follower_id, following_id)
+
+def remove_edge(follower_id: int, following_id: int) -> None:
+    with _write_lock:
+        if _journal is not None:
+            _journal.append((False, follower_id, following_id))
+        if _graph is not None:
+            _graph.remove_edge(follower_id, following_id)
+
+def _rebuild_with_session() -> None:
+    db = SessionLocal()
+    try:
+        rebuild(db)
+    finally:
+        db.close()
+
+async def _rebuild_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.FOLLOW_GRAPH_REBUILD_SECONDS)
+        try:
+            await run_in_threadpool(_rebuild_with_session)
+        except Exception:
+            logger.exception("Follow graph rebuild failed, keeping the previous index")
+
+async def start() -> None:
+    global _rebuilder
+    await run_in_threadpool(_rebuild_with_session)
+    if settings.FOLLOW_GRAPH_REBUILD_SECONDS > 0 and _rebuilder is None:
+        _rebuilder = asyncio.create_task(_rebuild_loop())
+
+async def stop() -> None:
+    global _rebuilder, _graph
+    if _rebuilder is not None:
+        _rebuilder.cancel()
+        try:
+            await _rebuilder
+        except asyncio.CancelledError:
+            pass
+        _rebuilder = None
+    _graph = None
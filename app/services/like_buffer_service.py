@@ -0,0 +1,183 @@
+"""
+Optional write-behind layer for likes (settings.LIKE_WRITE_BEHIND).
+
+Like/unlike requests only record the user's latest intent in memory; a
+background task flushes every LIKE_FLUSH_INTERVAL_MS. Per post, a flush is
+one bulk INSERT ... ON CONFLICT DO NOTHING, one bulk DELETE, one counter
+UPDATE and one bulk notification INSERT, all in a single transaction, so a
+viral post costs a handful of statements per interval instead of several
+per tap.
+
+Durability: an acknowledged like lives only in this worker's memory until
+the next flush. A clean shutdown flushes (see lifespan in main.py); a crash
+or SIGKILL loses at most one interval of likes/unlikes from that worker.
+Each worker process has its own buffer; that is safe because the flush only
+counts rows that actually changed, but a user's own like may take up to
+one interval to show up in is_liked_by_me / likes_count.
+
+Each post is flushed in its own savepoint. Intents whose post or user was
+deleted in the meantime are dropped, never retried; only a failure of the
+whole transaction (connection lost, lock timeout) puts the batch back.
+"""
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.utils import dialect_insert
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+from app.models.notification import Notification, NotificationType
+
+# post_id -> {user_id: liked?}; later taps overwrite earlier ones
+_pending: Dict[int, Dict[int, bool]] = {}
+_lock = threading.Lock()
+# Posts we have recently seen exist, so hot posts skip the existence check.
+# Bounded, and expiring so deletes made through other workers are noticed.
+_known_posts = TTLCache(maxsize=100_000, ttl=10 * 60)
+_flusher: Optional[asyncio.Task] = None
+# Rows per statement, to stay under bind-parameter limits
+FLUSH_CHUNK_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+def post_exists(db: Session, post_id: int) -> bool:
+    if _known_posts.get(post_id):
+        return True
+    if db.query(Post.id).filter(Post.id == post_id).first() is None:
+        return False
+    _known_posts.set(post_id, True)
+    return True
+
+def forget_post(post_id: int) -> None:
+    """Call when a post is deleted; its buffered intents are dropped at the next flush."""
+    _known_posts.delete(post_id)
+
+def record(user_id: int, post_id: int, liked: bool) -> None:
+    with _lock:
+        _pending.setdefault(post_id, {})[user_id] = liked
+
+def _flush_post(db: Session, post_id: int, intents: Dict[int, bool]) -> None:
+    owner_id = db.execute(select(Post.user_id).where(Post.id == post_id)).scalar()
+    if owner_id is None:
+        # Deleted since the taps: nothing left to like or unlike
+        forget_post(post_id)
+        return
+
+    likers = [user_id for user_id, liked in intents.items() if liked]
+    unlikers = [user_id for user_id, liked in intents.items() if not liked]
+    added: list[int] = []
+    removed = 0
+
+    for i in range(0, len(likers), FLUSH_CHUNK_SIZE):
+        rows = db.execute(
+            dialect_insert(db, Like).values(
+                [{"user_id": user_id, "post_id": post_id} for user_id in likers[i:i + FLUSH_CHUNK_SIZE]]
+            ).on_conflict_do_nothing(
+                index_elements=[Like.user_id, Like.post_id]
+            ).returning(Like.user_id)
+        ).all()
+        added.extend(row[0] for row in rows)
+    for i in range(0, len(unlikers), FLUSH_CHUNK_SIZE):
+        removed += len(db.execute(
+            delete(Like).where(
+                Like.post_id == post_id, Like.user_id.in_(unlikers[i:i + FLUSH_CHUNK_SIZE])
+            ).returning(Like.id)
+        ).all())
+
+    if len(added) != removed:
+        db.execute(
+            update(Post).where(Post.id == post_id).values(
+                likes_count=Post.likes_count + len(added) - removed
+            )
+        )
+    if added:
+        notifications = [
+            {
+                "receiver_id": owner_id,
+                "sender_id": user_id,
+                "type": NotificationType.like,
+                "post_id": post_id,
+                "is_read": False,
+            }
+            for user_id in added if user_id != owner_id
+        ]
+        for i in range(0, len(notifications), FLUSH_CHUNK_SIZE):
+            db.execute(dialect_insert(db, Notification).values(notifications[i:i + FLUSH_CHUNK_SIZE]))
+
+def flush() -> int:
+    """Write all buffered intents. Returns the number of intents flushed."""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+
+    db = SessionLocal()
+    try:
+        for post_id, intents in batch.items():
+            try:
+                with db.begin_nested():
+                    _flush_post(db, post_id, intents)
+            except IntegrityError:
+                # A liker (or the post) was deleted mid-flush: retry once
+                # without intents pointing at missing users, else drop them
+                intents = _without_missing_users(db, intents)
+                try:
+                    with db.begin_nested():
+                        _flush_post(db, post_id, intents)
+                except IntegrityError:
+                    logger.exception("Dropping %d buffered like intents for post %s", len(intents), post_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Transient failure of the whole transaction: put the batch back
+        # underneath anything recorded since, then retry next tick
+        with _lock:
+            for post_id, intents in batch.items():
+                newer = _pending.get(post_id, {})
+                _pending[post_id] = {**intents, **newer}
+        raise
+    finally:
+        db.close()
+    return sum(len(intents) for intents in batch.values())
+
+def _without_missing_users(db: Session, intents: Dict[int, bool]) -> Dict[int, bool]:
+    user_ids = list(intents)
+    existing = set()
+    for i in range(0, len(user_ids), FLUSH_CHUNK_SIZE):
+        existing.update(db.execute(select(User.id).where(User.id.in_(user_ids[i:i + FLUSH_CHUNK_SIZE]))).scalars())
+    return {user_id: liked for user_id, liked in intents.items() if user_id in existing}
+
+async def _flush_loop() -> None:
+    interval = settings.LIKE_FLUSH_INTERVAL_MS / 1000
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(flush)
+        except Exception:
+            logger.exception("Like flush failed, will retry")
+
+def start() -> None:
+    global _flusher
+    if _flusher is None:
+        _flusher = asyncio.create_task(_flush_loop())
+
+async def stop() -> None:
+    """Stop the background task and flush whatever is still buffered."""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    await run_in_threadpool(flush)
@@ -1,12 +1,16 @@
 from sqlalchemy.orm import Session
 from typing import List
+from app.db.loaders import get_user_loader
 from app.models.notification import Notification
 from app.models.user import User
 
 def get_my_notifications(db: Session, user_id: int, limit: int = 20, skip: int = 0) -> List[Notification]:
-    return db.query(Notification).filter(
+    notifications = db.query(Notification).filter(
         Notification.receiver_id == user_id
     ).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    # Senders in one query instead of one lazy load each
+    get_user_loader(db).load_many(n.sender_id for n in notifications)
+    return notifications
 
 def mark_all_as_read(db: Session, user_id: int):
     db.query(Notification).filter(
@@ -1,3 +1,7 @@
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import String, select, update, delete, literal, func, exists, and_, or_, type_coerce
 from sqlalchemy.orm import Session
 from app.models.post import Post
 from app.models.follow import Follow
@@ -5,53 +9,168 @@ from app.models.like import Like
 from app.models.comment import Comment
 from app.models.notification import Notification, NotificationType
 from app.schemas.social import PostCreate, CommentCreate, PostUpdate
+from app.schemas.user import UserPublic
 from app.models.user import User
-from typing import List, Optional
+from app.core.media import variant_urls
+from app.services import file_service, follow_graph_service, like_buffer_service
+from app.db.loaders import get_user_loader
+from app.db.utils import dialect_insert
+from typing import List, Optional, Sequence, Tuple
+from fastapi import HTTPException
 
 # --- Post Logic ---
 def create_post(db: Session, user_id: int, post_in: PostCreate) -> Post:
+    variants_ready = file_service.variants_exist(post_in.media_url)
     db_post = Post(
         user_id=user_id,
         content_text=post_in.content_text,
         caption=post_in.caption,
-        media_url=post_in.media_url
+        media_url=post_in.media_url,
+        media_variants_ready=variants_ready,
     )
     db.add(db_post)
     db.commit()
+    if not variants_ready:
+        file_service.settle_variants(db, post_in.media_url)
     db.refresh(db_post)
     return db_post
 
-def _populate_post_details(post: Post, current_user_id: int):
-    # This modifies the object in-place, which is okay for ORM objects attached to session, 
-    # but strictly we should map to a schema. For now, matching previous logic.
-    post.likes_count = len(post.likes)
-    post.comments_count = len(post.comments)
-    post.is_liked_by_me = any(l.user_id == current_user_id for l in post.likes)
-    return post
+def _populate_post_details(db: Session, posts: List[Post], current_user_id: int) -> None:
+    """Set comments_count / is_liked_by_me on a page of posts: one grouped COUNT and one IN query."""
+    if not posts:
+        return
+    post_ids = [p.id for p in posts]
+    comment_counts = dict(db.execute(
+        select(Comment.post_id, func.count(Comment.id))
+        .where(Comment.post_id.in_(post_ids)).group_by(Comment.post_id)
+    ).all())
+    liked = set(db.execute(
+        select(Like.post_id).where(Like.user_id == current_user_id, Like.post_id.in_(post_ids))
+    ).scalars())
+    for p in posts:
+        p.comments_count = comment_counts.get(p.id, 0)
+        p.is_liked_by_me = p.id in liked
 
-def get_feed(db: Session, user_id: int, limit: int = 50, skip: int = 0) -> List[Post]:
-    following_ids = db.query(Follow.following_id).filter(Follow.follower_id == user_id).all()
-    user_ids = [f[0] for f in following_ids]
+def _timeline_user_ids(db: Session, user_id: int) -> List[int]:
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        user_ids = list(graph.following_of(user_id))
+    else:
+        following_ids = db.query(Follow.following_id).filter(Follow.follower_id == user_id).all()
+        user_ids = [f[0] for f in following_ids]
     user_ids.append(user_id)
+    return user_ids
+
+def _version_columns(viewer_id: int):
+    # Everything a rendered post depends on besides its own row: its owner's
+    # row, comment count / newest comment (catches adds and deletes) and the
+    # viewer's like
+    return (
+        Post.id,
+        Post.updated_at,
+        Post.media_variants_ready,
+        Post.likes_count,
+        select(User.updated_at).where(User.id == Post.user_id).scalar_subquery(),
+        select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery(),
+        select(func.max(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery(),
+        exists().where(Like.post_id == Post.id, Like.user_id == viewer_id),
+    )
+
+def get_feed_version(db: Session, user_id: int, limit: int = 50, skip: int = 0) -> tuple:
+    """
+    Version markers for one feed page, from a single narrow query (no
+    relationship loading). Changes whenever the rendered page would.
+    """
+    rows = db.query(*_version_columns(user_id)).filter(
+        Post.user_id.in_(_timeline_user_ids(db, user_id))
+    ).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+    return tuple(tuple(row) for row in rows)
+
+def get_post_version(db: Session, post_id: int, current_user_id: int) -> Optional[tuple]:
+    """Version markers for get_post, or None if the post doesn't exist."""
+    # Authors of the embedded first page of comments
+    first_page = select(Comment.user_id).where(Comment.post_id == post_id).order_by(
+        Comment.created_at, Comment.id
+    ).limit(COMMENTS_PAGE_SIZE).subquery()
+    commenters_updated_at = select(func.max(User.updated_at)).where(
+        User.id.in_(select(first_page.c.user_id))
+    ).scalar_subquery()
+    row = db.query(*_version_columns(current_user_id), commenters_updated_at).filter(Post.id == post_id).first()
+    return tuple(row) if row is not None else None
+
+# Fields a sparse post list (?fields=) may ask for, as for users
+POST_COLUMNS = ("id", "user_id", "content_text", "caption", "media_url", "created_at", "updated_at", "likes_count")
+POST_FIELDS = POST_COLUMNS + ("comments_count", "is_liked_by_me", "media_variants")
+
+def project_posts(query, fields: Sequence[str], current_user_id: int) -> List[dict]:
+    """
+    Run a Post query selecting only what `fields` needs (counts and the
+    viewer's like as subqueries instead of loading collections).
+    """
+    columns = [getattr(Post, name) for name in POST_COLUMNS if name in fields]
+    if "media_variants" in fields:
+        if "media_url" not in fields:
+            columns.append(Post.media_url)
+        columns.append(Post.media_variants_ready)
+    if "comments_count" in fields:
+        columns.append(select(func.count(Comment.id)).where(Comment.post_id == Post.id)
+                       .correlate(Post).scalar_subquery().label("comments_count"))
+    if "is_liked_by_me" in fields:
+        columns.append(exists().where(Like.post_id == Post.id, Like.user_id == current_user_id)
+                       .label("is_liked_by_me"))
+
+    result = []
+    for row in query.with_entities(*columns):
+        values = row._mapping
+        result.append({
+            name: variant_urls(values["media_url"], values["media_variants_ready"]) if name == "media_variants" else values[name]
+            for name in fields
+        })
+    return result
+
+def with_owner_table(db: Session, posts: list) -> dict:
+    """Normalized page: the posts plus each distinct owner once."""
+    owners = get_user_loader(db).load_many(p["user_id"] if isinstance(p, dict) else p.user_id for p in posts)
+    return {"posts": posts, "users": [UserPublic.model_validate(owner) for owner in owners.values()]}
+
+def get_feed(db: Session, user_id: int, limit: int = 50, skip: int = 0, fields: Optional[Sequence[str]] = None) -> list:
+    user_ids = _timeline_user_ids(db, user_id)
     
-    posts = db.query(Post).filter(
+    query = db.query(Post).filter(
         Post.user_id.in_(user_ids)
-    ).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(Post.created_at.desc()).offset(skip).limit(limit)
+    if fields:
+        return project_posts(query, fields, user_id)
+    posts = query.all()
     
-    for p in posts:
-        _populate_post_details(p, user_id)
+    get_user_loader(db).load_many(p.user_id for p in posts)
+    _populate_post_details(db, posts, user_id)
     return posts
 
-def get_user_posts(db: Session, user_id: int, current_user_id: int, limit: int = 50, skip: int = 0) -> List[Post]:
-    posts = db.query(Post).filter(Post.user_id == user_id).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
-    for p in posts:
-        _populate_post_details(p, current_user_id)
+def get_user_posts(db: Session, user_id: int, current_user_id: int, limit: int = 50, skip: int = 0, fields: Optional[Sequence[str]] = None) -> list:
+    query = db.query(Post).filter(Post.user_id == user_id).order_by(Post.created_at.desc()).offset(skip).limit(limit)
+    if fields:
+        return project_posts(query, fields, current_user_id)
+    posts = query.all()
+    get_user_loader(db).load_many(p.user_id for p in posts)
+    _populate_post_details(db, posts, current_user_id)
     return posts
 
+def post_exists(db: Session, post_id: int) -> bool:
+    return db.query(exists().where(Post.id == post_id)).scalar()
+
 def get_post(db: Session, post_id: int, current_user_id: Optional[int] = None) -> Optional[Post]:
     post = db.query(Post).filter(Post.id == post_id).first()
     if post and current_user_id:
-        _populate_post_details(post, current_user_id)
+        # Counts and the first page of comments only: never load the whole
+        # comments / likes collections of a popular post
+        post.comments_count = db.query(func.count(Comment.id)).filter(Comment.post_id == post_id).scalar()
+        post.is_liked_by_me = db.query(
+            exists().where(Like.post_id == post_id, Like.user_id == current_user_id)
+        ).scalar()
+        post.comments_page, post.comments_next_cursor = _comments_page(db, post_id, None, COMMENTS_PAGE_SIZE)
+        # Owner and the page's authors in one query
+        get_user_loader(db).load_many([post.user_id, *(c.user_id for c in post.comments_page)])
     return post
 
 def update_post(db: Session, user_id: int, post_id: int, post_in: PostUpdate) -> Optional[Post]:
@@ -63,10 +182,19 @@ def update_post(db: Session, user_id: int, post_id: int, post_in: PostUpdate) ->
         post.content_text = post_in.content_text
     if post_in.caption is not None:
         post.caption = post_in.caption
-    if post_in.media_url is not None:
-        post.media_url = post_in.media_url
+    old_media_url = post.media_url
+    new_media_url = None
+    if post_in.media_url is not None and post_in.media_url != old_media_url:
+        new_media_url = post_in.media_url
+        variants_ready = file_service.variants_exist(new_media_url)
+        post.media_url = new_media_url
+        post.media_variants_ready = variants_ready
         
     db.commit()
+    if new_media_url is not None:
+        if not variants_ready:
+            file_service.settle_variants(db, new_media_url)
+        file_service.release_upload(db, old_media_url)
     db.refresh(post)
     return post
 
@@ -83,45 +211,109 @@ def delete_post(db: Session, user_id: int, post_id: int) -> bool:
     # Ideally should delete likes/comments first if no cascade.
     
     # Let's check models later, for now try delete.
+    media_url = post.media_url
     db.delete(post)
     db.commit()
+    like_buffer_service.forget_post(post_id)
+    file_service.release_upload(db, media_url)
     return True
 
 # --- Interaction Logic ---
 
 def like_post(db: Session, user_id: int, post_id: int):
-    # Check if post exists
-    post = get_post(db, post_id)
-    if not post:
-        return False
-        
-    existing_like = db.query(Like).filter(Like.user_id == user_id, Like.post_id == post_id).first()
-    if existing_like:
-        return True # Already liked
-        
-    new_like = Like(user_id=user_id, post_id=post_id)
-    db.add(new_like)
-    
-    # Notify post owner (if not self)
-    if post.user_id != user_id:
-        notif = Notification(
-            receiver_id=post.user_id,
-            sender_id=user_id,
-            type=NotificationType.like,
-            post_id=post_id
+    # Single statement: insert the like only if the post exists and the user
+    # hasn't liked it yet. A returned row means something actually changed.
+    like_stmt = dialect_insert(db, Like).from_select(
+        [Like.user_id, Like.post_id],
+        select(literal(user_id), Post.id).where(Post.id == post_id),
+    ).on_conflict_do_nothing(
+        index_elements=[Like.user_id, Like.post_id]
+    ).returning(Like.id)
+    inserted = db.execute(like_stmt).first()
+
+    if inserted is None:
+        # Already liked (idempotent) or no such post
+        return db.query(Post.id).filter(Post.id == post_id).first() is not None
+
+    db.execute(
+        update(Post).where(Post.id == post_id).values(likes_count=Post.likes_count + 1)
+    )
+    # Notify post owner (if not self), without loading the post
+    db.execute(
+        dialect_insert(db, Notification).from_select(
+            [Notification.receiver_id, Notification.sender_id, Notification.type, Notification.post_id, Notification.is_read],
+            select(
+                Post.user_id,
+                literal(user_id),
+                literal(NotificationType.like, Notification.type.type),
+                Post.id,
+                literal(False),
+            ).where(Post.id == post_id, Post.user_id != user_id),
         )
-        db.add(notif)
-        
+    )
     db.commit()
     return True
 
-def unlike_post(db: Session, user_id: int, post_id: int):
-    existing_like = db.query(Like).filter(Like.user_id == user_id, Like.post_id == post_id).first()
-    if existing_like:
-        db.delete(existing_like)
+def unlike_post(db: Session, user_id: int, post_id: int) -> bool:
+    """False if the post doesn't exist; unliking a post that isn't liked is a no-op."""
+    deleted = db.execute(
+        delete(Like).where(Like.user_id == user_id, Like.post_id == post_id).returning(Like.id)
+    ).first()
+    if deleted is None:
         db.commit()
+        return post_exists(db, post_id)
+    db.execute(
+        update(Post).where(Post.id == post_id).values(likes_count=Post.likes_count - 1)
+    )
+    db.commit()
     return True
 
+COMMENTS_PAGE_SIZE = 20
+
+def _encode_cursor(comment: Comment) -> str:
+    raw = f"{comment.created_at.isoformat()}|{comment.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, comment_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(comment_id)
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _sqlite_timestamp(value: datetime) -> str:
+    # SQLite keeps timestamps as text: server defaults (CURRENT_TIMESTAMP) in
+    # whole seconds, values bound by SQLAlchemy with six fractional digits.
+    # Bind the cursor in the same text form so it compares equal to its row.
+    text_value = value.strftime("%Y-%m-%d %H:%M:%S")
+    return f"{text_value}.{value.microsecond:06d}" if value.microsecond else text_value
+
+def _comments_page(db: Session, post_id: int, cursor: Optional[str], limit: int) -> Tuple[List[Comment], Optional[str]]:
+    # Keyset pagination over comments(post_id, created_at, id): each page is
+    # an index range scan, however deep the cursor. The column is compared
+    # as stored so the index stays usable.
+    query = db.query(Comment).filter(Comment.post_id == post_id)
+    if cursor:
+        after_time, after_id = _decode_cursor(cursor)
+        after = after_time
+        if db.get_bind().dialect.name == "sqlite":
+            after = type_coerce(_sqlite_timestamp(after_time), String)
+        query = query.filter(or_(
+            Comment.created_at > after,
+            and_(Comment.created_at == after, Comment.id > after_id),
+        ))
+    rows = query.order_by(Comment.created_at, Comment.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], _encode_cursor(rows[limit - 1])
+    return rows, None
+
+def get_comments_page(db: Session, post_id: int, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE):
+    """A page of a post's comments, oldest first, and the cursor for the next one."""
+    comments, next_cursor = _comments_page(db, post_id, cursor, limit)
+    get_user_loader(db).load_many(c.user_id for c in comments)
+    return comments, next_cursor
+
 def add_comment(db: Session, user_id: int, post_id: int, comment_in: CommentCreate) -> Optional[Comment]:
     post = get_post(db, post_id)
     if not post:
@@ -1,7 +1,12 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
+from app.db.loaders import get_user_loader
+from app.db.utils import dialect_insert
 from app.models.follow import Follow
 from app.models.user import User
 from app.models.notification import Notification, NotificationType
+from app.schemas.user import UserWithRelationship, BulkFollowResult
+from app.services import follow_graph_service, suggestion_service, user_service
 from fastapi import HTTPException
 
 def follow_user(db: Session, follower_id: int, following_id: int):
@@ -31,8 +36,57 @@ def follow_user(db: Session, follower_id: int, following_id: int):
     
     db.commit()
     db.refresh(new_follow)
+    follow_graph_service.add_edge(follower_id, following_id)
+    suggestion_service.invalidate(follower_id)
     return new_follow
 
+def bulk_follow(db: Session, follower_id: int, user_ids: Iterable[int]) -> List[BulkFollowResult]:
+    """
+    Follow many users at once: one existence check, one conflict-skipping
+    INSERT, one notification INSERT and a single commit.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    existing = set(get_user_loader(db).load_many(ids))
+    targets = [uid for uid in ids if uid in existing and uid != follower_id]
+
+    followed: set[int] = set()
+    if targets:
+        followed = set(db.execute(
+            dialect_insert(db, Follow).values(
+                [{"follower_id": follower_id, "following_id": uid} for uid in targets]
+            ).on_conflict_do_nothing(
+                index_elements=[Follow.follower_id, Follow.following_id]
+            ).returning(Follow.following_id)
+        ).scalars())
+    if followed:
+        db.execute(dialect_insert(db, Notification).values([
+            {
+                "receiver_id": uid,
+                "sender_id": follower_id,
+                "type": NotificationType.follow,
+                "is_read": False,
+            }
+            for uid in targets if uid in followed
+        ]))
+    db.commit()
+    for uid in followed:
+        follow_graph_service.add_edge(follower_id, uid)
+    if followed:
+        suggestion_service.invalidate(follower_id)
+
+    results = []
+    for uid in ids:
+        if uid == follower_id:
+            status = "self"
+        elif uid not in existing:
+            status = "not_found"
+        elif uid in followed:
+            status = "followed"
+        else:
+            status = "already_following"
+        results.append(BulkFollowResult(user_id=uid, status=status))
+    return results
+
 def unfollow_user(db: Session, follower_id: int, following_id: int):
     existing_follow = db.query(Follow).filter(
         Follow.follower_id == follower_id,
@@ -42,27 +96,82 @@ def unfollow_user(db: Session, follower_id: int, following_id: int):
     if existing_follow:
         db.delete(existing_follow)
         db.commit()
+        follow_graph_service.remove_edge(follower_id, following_id)
+        suggestion_service.invalidate(follower_id)
         return True
     return False
 
 def is_following(db: Session, follower_id: int, following_id: int) -> bool:
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        return graph.is_following(follower_id, following_id)
     return db.query(Follow).filter(
         Follow.follower_id == follower_id, 
         Follow.following_id == following_id
     ).first() is not None
 
-def get_followers(db: Session, user_id: int):
+def get_followers(db: Session, user_id: int, fields: Optional[Sequence[str]] = None):
     """
     Get list of users responding to who follows the given user_id.
+    With fields, only those are selected and plain dicts are returned.
     """
-    return db.query(User).join(Follow, Follow.follower_id == User.id).filter(
+    query = db.query(User).join(Follow, Follow.follower_id == User.id).filter(
         Follow.following_id == user_id
-    ).all()
+    )
+    return user_service.project_users(query, fields) if fields else query.all()
 
-def get_following(db: Session, user_id: int):
+def get_following(db: Session, user_id: int, fields: Optional[Sequence[str]] = None):
     """
     Get list of users that the given user_id is following.
+    With fields, only those are selected and plain dicts are returned.
     """
-    return db.query(User).join(Follow, Follow.following_id == User.id).filter(
+    query = db.query(User).join(Follow, Follow.following_id == User.id).filter(
         Follow.follower_id == user_id
-    ).all()
+    )
+    return user_service.project_users(query, fields) if fields else query.all()
+
+def get_relationships(db: Session, viewer_id: int, user_ids: Iterable[int]) -> Dict[int, Tuple[bool, bool]]:
+    """
+    (viewer follows them, they follow viewer) for each id, answered with two
+    set-based queries (or the in-memory graph) regardless of how many ids.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        return {
+            uid: (graph.is_following(viewer_id, uid), graph.is_following(uid, viewer_id))
+            for uid in ids
+        }
+
+    following = {
+        row[0] for row in db.query(Follow.following_id).filter(
+            Follow.follower_id == viewer_id, Follow.following_id.in_(ids)
+        )
+    }
+    followed_by = {
+        row[0] for row in db.query(Follow.follower_id).filter(
+            Follow.following_id == viewer_id, Follow.follower_id.in_(ids)
+        )
+    }
+    return {uid: (uid in following, uid in followed_by) for uid in ids}
+
+def with_relationships(db: Session, viewer_id: int, users: list) -> list:
+    """
+    Attach is_following / is_followed_by to a list of users: ORM rows or
+    UserPublic become UserWithRelationship, sparse dicts stay dicts.
+    """
+    if users and isinstance(users[0], dict):
+        relationships = get_relationships(db, viewer_id, [u["id"] for u in users])
+        return [
+            {**user, "is_following": relationships[user["id"]][0], "is_followed_by": relationships[user["id"]][1]}
+            for user in users
+        ]
+
+    relationships = get_relationships(db, viewer_id, [u.id for u in users])
+    result = []
+    for user in users:
+        following, followed_by = relationships[user.id]
+        result.append(UserWithRelationship.model_validate(user, from_attributes=True).model_copy(
+            update={"is_following": following, "is_followed_by": followed_by}
+        ))
+    return result
@@ -0,0 +1,161 @@
+import time
+import heapq
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.follow import Follow
+from app.models.user import User
+from app.schemas.social import SuggestedUser
+from app.services import follow_graph_service, user_service
+
+# user_id -> [(candidate_id, mutual_count), ...], best first
+_cache = TTLCache(maxsize=settings.SUGGESTIONS_CACHE_SIZE, ttl=settings.SUGGESTIONS_CACHE_TTL_SECONDS)
+# Users who asked for suggestions recently; their lists are kept warm
+_active: Dict[int, float] = {}
+ACTIVE_WINDOW_SECONDS = 60 * 60
+MAX_CANDIDATES = 100
+_refresher: Optional[asyncio.Task] = None
+
+logger = logging.getLogger(__name__)
+
+_MUTUALS_SQL = text("""
+    SELECT f2.following_id, COUNT(*) AS mutual_count
+    FROM follows f1
+    JOIN follows f2 ON f2.follower_id = f1.following_id
+    WHERE f1.follower_id = :user_id
+      AND f2.following_id != :user_id
+      AND f2.following_id NOT IN (SELECT following_id FROM follows WHERE follower_id = :user_id)
+    GROUP BY f2.following_id
+    ORDER BY mutual_count DESC, f2.following_id
+    LIMIT :limit
+""")
+
+def rank_candidates(db: Session, user_id: int, limit: int = MAX_CANDIDATES) -> List[Tuple[int, int]]:
+    """
+    Friends-of-friends ranked by how many of the people `user_id` follows
+    also follow them. Already-followed users and the user themself are excluded.
+    """
+    graph = follow_graph_service.get_graph()
+    if graph is None:
+        # One set-based query instead of walking the graph per user
+        return [tuple(row) for row in db.execute(_MUTUALS_SQL, {"user_id": user_id, "limit": limit})]
+
+    following = graph.following_of(user_id)
+    counts = Counter()
+    # Counter.update over int arrays counts in C; this is the hot loop
+    for followed_id in following:
+        counts.update(graph.following_of(followed_id))
+    counts.pop(user_id, None)
+    for followed_id in following:
+        counts.pop(followed_id, None)
+    # Highest count first, lower id first on ties (stable across calls)
+    return heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+
+def _cached_candidates(db: Session, user_id: int) -> List[Tuple[int, int]]:
+    _active[user_id] = time.monotonic()
+    ranked = _cache.get(user_id)
+    if ranked is None:
+        ranked = rank_candidates(db, user_id)
+        _cache.set(user_id, ranked)
+    return ranked
+
+def invalidate(user_id: int) -> None:
+    """Drop a user's cached candidates after they follow or unfollow someone."""
+    _cache.delete(user_id)
+
+def _drop_followed(db: Session, user_id: int, ranked: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # The cache may predate a follow made through another worker
+    if not ranked:
+        return ranked
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        followed = set(graph.following_of(user_id))
+    else:
+        followed = set(db.execute(
+            select(Follow.following_id).where(
+                Follow.follower_id == user_id, Follow.following_id.in_([uid for uid, _ in ranked])
+            )
+        ).scalars())
+    return [item for item in ranked if item[0] not in followed]
+
+def get_suggestions(db: Session, user_id: int, limit: int = 20) -> List[SuggestedUser]:
+    ranked = _drop_followed(db, user_id, _cached_candidates(db, user_id))[:limit]
+    if not ranked:
+        return []
+
+    users = {
+        row[0].id: row
+        for row in user_service.with_follow_counts(
+            db.query(User).filter(User.id.in_([uid for uid, _ in ranked]))
+        )
+    }
+    result = []
+    for candidate_id, mutual_count in ranked:
+        if candidate_id not in users:
+            continue
+        user, followers_count, following_count = users[candidate_id]
+        result.append(SuggestedUser(
+            id=user.id,
+            username=user.username,
+            full_name=user.full_name,
+            bio=user.bio,
+            profile_picture_url=user.profile_picture_url,
+            profile_picture_variants_ready=user.profile_picture_variants_ready,
+            created_at=user.created_at,
+            followers_count=followers_count,
+            following_count=following_count,
+            mutual_follows_count=mutual_count
+        ))
+    return result
+
+def refresh_active() -> int:
+    """Recompute cached suggestions for recently active users."""
+    cutoff = time.monotonic() - ACTIVE_WINDOW_SECONDS
+    for user_id, last_seen in list(_active.items()):
+        if last_seen < cutoff:
+            _active.pop(user_id, None)
+    if not _active:
+        return 0
+
+    db = SessionLocal()
+    try:
+        for user_id in list(_active):
+            _cache.set(user_id, rank_candidates(db, user_id))
+    finally:
+        db.close()
+    return len(_active)
+
+async def _refresh_loop() -> None:
+    # Refresh a little more often than entries expire so active users never miss
+    interval = max(settings.SUGGESTIONS_CACHE_TTL_SECONDS * 0.8, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(refresh_active)
+        except Exception:
+            logger.exception("Suggestion refresh failed")
+
+def start() -> None:
+    global _refresher
+    if _refresher is None:
+        _refresher = asyncio.create_task(_refresh_loop())
+
+async def stop() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+        _refresher = None
+
+def cache_stats() -> dict:
+    return _cache.stats()
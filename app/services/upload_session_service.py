@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import aiofiles
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Tuple
+from fastapi import HTTPException
+from app.services import file_service
+
+# Partial files live next to (not inside) the public uploads dir so they are
+# never served, but on the same filesystem so completion is a plain rename.
+SESSION_DIR = "upload_sessions"
+# Resumable uploads are for video; anything else gets the direct-upload limit
+MAX_SESSION_FILE_SIZES = {
+    ".mp4": 512 * 1024 * 1024,  # 512 MB
+    ".mov": 512 * 1024 * 1024,
+}
+MAX_CHUNK_SIZE = 16 * 1024 * 1024  # 16 MB per PUT
+SESSION_TTL_SECONDS = 24 * 60 * 60
+CLEANUP_INTERVAL_SECONDS = 10 * 60
+
+SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+os.makedirs(SESSION_DIR, exist_ok=True)
+
+# One writer per session within this process
+_session_locks: Dict[str, asyncio.Lock] = {}
+_last_cleanup = 0.0
+
+def _meta_path(session_id: str) -> str:
+    return os.path.join(SESSION_DIR, f"{session_id}.json")
+
+def _part_path(session_id: str) -> str:
+    return os.path.join(SESSION_DIR, f"{session_id}.part")
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Upload session not found")
+
+def _part_stat(session_id: str) -> os.stat_result:
+    # The session can be cancelled or expire while a request is using it
+    try:
+        return os.stat(_part_path(session_id))
+    except FileNotFoundError:
+        raise _not_found()
+
+def _offset(session_id: str) -> int:
+    return _part_stat(session_id).st_size
+
+def max_session_size(ext: str) -> int:
+    return MAX_SESSION_FILE_SIZES.get(ext, file_service.MAX_FILE_SIZE)
+
+def _to_response(session_id: str, meta: dict) -> dict:
+    part = _part_stat(session_id)
+    return {
+        "id": session_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "offset": part.st_size,
+        # Same rule as cleanup_stale_sessions: every chunk extends the session
+        "expires_at": datetime.fromtimestamp(part.st_mtime + SESSION_TTL_SECONDS, tz=timezone.utc),
+    }
+
+def _load(user_id: int, session_id: str) -> dict:
+    if not SESSION_ID_RE.match(session_id):
+        raise _not_found()
+    try:
+        with open(_meta_path(session_id)) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise _not_found()
+    if meta["user_id"] != user_id:
+        raise _not_found()
+    return meta
+
+def _delete(session_id: str) -> None:
+    for path in (_part_path(session_id), _meta_path(session_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _session_locks.pop(session_id, None)
+
+def cleanup_stale_sessions() -> int:
+    """
+    Remove sessions whose partial file has not been written to for
+    SESSION_TTL_SECONDS. Returns the number of sessions removed.
+    """
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    removed = 0
+    with os.scandir(SESSION_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            session_id = entry.name[:-len(".json")]
+            part = _part_path(session_id)
+            try:
+                last_write = os.path.getmtime(part)
+            except FileNotFoundError:
+                last_write = entry.stat().st_mtime
+            if last_write < cutoff:
+                _delete(session_id)
+                removed += 1
+    return removed
+
+def _maybe_cleanup() -> None:
+    # Cheap enough to piggyback on session creation instead of a scheduler
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup >= CLEANUP_INTERVAL_SECONDS:
+        _last_cleanup = now
+        cleanup_stale_sessions()
+
+def parse_content_range(header: str) -> Tuple[int, int, int]:
+    """Parse "bytes start-end/total" into (start, end_inclusive, total)."""
+    match = CONTENT_RANGE_RE.match(header or "")
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range must be 'bytes start-end/total'")
+    start, end, total = (int(group) for group in match.groups())
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range")
+    return start, end, total
+
+def create_session(user_id: int, filename: str, size: int) -> dict:
+    _maybe_cleanup()
+    ext = file_service.validate_extension(filename)
+    max_size = max_session_size(ext)
+    if size <= 0 or size > max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size for {ext} files: {max_size // (1024*1024)} MB"
+        )
+
+    session_id = uuid.uuid4().hex
+    meta = {
+        "user_id": user_id,
+        "filename": filename,
+        "ext": ext,
+        "size": size,
+        "created_at": time.time(),
+    }
+    open(_part_path(session_id), "wb").close()
+    with open(_meta_path(session_id), "w") as f:
+        json.dump(meta, f)
+    return _to_response(session_id, meta)
+
+def get_session(user_id: int, session_id: str) -> dict:
+    return _to_response(session_id, _load(user_id, session_id))
+
+async def append_chunk(
+    user_id: int, session_id: str, content_range: str, body: AsyncIterator[bytes]
+) -> dict:
+    """
+    Append one byte range to the session's partial file.
+    The range must start exactly at the current offset; otherwise 409 and the
+    client should GET the session and resume from the reported offset.
+    """
+    meta = _load(user_id, session_id)
+    start, end, total = parse_content_range(content_range)
+    if total != meta["size"] or end >= meta["size"]:
+        raise HTTPException(status_code=416, detail="Range does not match the declared file size")
+    expected = end - start + 1
+    if expected > MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Chunk too large. Maximum chunk: {MAX_CHUNK_SIZE // (1024*1024)} MB"
+        )
+
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        offset = _offset(session_id)
+        if start != offset:
+            raise HTTPException(status_code=409, detail=f"Expected range to start at offset {offset}")
+
+        received = 0
+        try:
+            # r+b rather than ab: never recreate a part file removed meanwhile
+            async with aiofiles.open(_part_path(session_id), "r+b") as out_file:
+                await out_file.seek(start)
+                async for chunk in body:
+                    received += len(chunk)
+                    if received > expected:
+                        # Client sent more than it declared: drop the whole chunk
+                        await out_file.truncate(start)
+                        raise HTTPException(status_code=400, detail="Chunk body longer than Content-Range")
+                    await out_file.write(chunk)
+        except FileNotFoundError:
+            raise _not_found()
+        # A short body (dropped connection) keeps what arrived; the client
+        # resumes from the new offset.
+
+    return _to_response(session_id, meta)
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def complete_session(user_id: int, session_id: str) -> tuple[str, str]:
+    """Move a fully uploaded session into the store and return (url, filename)."""
+    meta = _load(user_id, session_id)
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        part = _part_path(session_id)
+        offset = _offset(session_id)
+        if offset != meta["size"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {offset} of {meta['size']} bytes received"
+            )
+        try:
+            hexdigest = await asyncio.to_thread(_hash_file, part)
+            result = file_service.store_file(part, meta["ext"], hexdigest)
+        except FileNotFoundError:
+            # Cancelled (or expired) while we were hashing
+            _delete(session_id)
+            raise _not_found()
+        _delete(session_id)
+    return result
+
+def cancel_session(user_id: int, session_id: str) -> None:
+    _load(user_id, session_id)
+    _delete(session_id)
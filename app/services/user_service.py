@@ -1,9 +1,13 @@
 import re
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, object_session
+from app.models.follow import Follow
 from app.models.user import User
 from app.schemas.user import UserUpdate, UserPublic
+from app.core.media import variant_urls
 from app.core.security import verify_password, get_password_hash
-from typing import Optional
+from app.services import file_service, follow_graph_service
+from typing import Optional, Sequence
 
 def get_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
@@ -19,23 +23,112 @@ def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
         db_user.full_name = user_in.full_name
     if user_in.bio is not None:
         db_user.bio = user_in.bio
-    if user_in.profile_picture_url is not None:
-        db_user.profile_picture_url = user_in.profile_picture_url
+    old_picture_url = db_user.profile_picture_url
+    new_picture_url = None
+    if user_in.profile_picture_url is not None and user_in.profile_picture_url != old_picture_url:
+        new_picture_url = user_in.profile_picture_url
+        variants_ready = file_service.variants_exist(new_picture_url)
+        db_user.profile_picture_url = new_picture_url
+        db_user.profile_picture_variants_ready = variants_ready
         
     db.commit()
+    if new_picture_url is not None:
+        if not variants_ready:
+            file_service.settle_variants(db, new_picture_url)
+        file_service.release_upload(db, old_picture_url)
     db.refresh(db_user)
     return db_user
 
 def get(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
+def follow_counts(user: User) -> tuple[int, int]:
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        return graph.follower_count(user.id), graph.following_count(user.id)
+    # COUNT(*) rather than len(user.followers): don't load every follower row
+    db = object_session(user)
+    followers = db.query(func.count(Follow.id)).filter(Follow.following_id == user.id).scalar()
+    following = db.query(func.count(Follow.id)).filter(Follow.follower_id == user.id).scalar()
+    return followers, following
+
+# correlate(User) only: list queries may already join follows
+def _followers_count():
+    return select(func.count(Follow.id)).where(Follow.following_id == User.id).correlate(User).scalar_subquery()
+
+def _following_count():
+    return select(func.count(Follow.id)).where(Follow.follower_id == User.id).correlate(User).scalar_subquery()
+
+def with_follow_counts(query) -> list[tuple[User, int, int]]:
+    """(user, followers, following) per row of a User query, counted in the same statement."""
+    graph = follow_graph_service.get_graph()
+    if graph is not None:
+        return [(user, graph.follower_count(user.id), graph.following_count(user.id)) for user in query]
+    return [tuple(row) for row in query.add_columns(_followers_count(), _following_count())]
+
+# Fields a sparse user list (?fields=) may ask for. Plain columns are
+# selected as-is; the rest are derived from a column or a subquery.
+USER_COLUMNS = ("id", "username", "full_name", "bio", "profile_picture_url", "created_at")
+USER_FIELDS = USER_COLUMNS + ("followers_count", "following_count", "profile_picture_variants")
+
+def project_users(query, fields: Sequence[str]) -> list[dict]:
+    """
+    Run a User query selecting only what `fields` needs; returns one dict
+    per user with exactly those keys.
+    """
+    graph = follow_graph_service.get_graph()
+    columns = [getattr(User, name) for name in USER_COLUMNS if name in fields]
+    if "profile_picture_variants" in fields:
+        if "profile_picture_url" not in fields:
+            columns.append(User.profile_picture_url)
+        columns.append(User.profile_picture_variants_ready)
+    if "id" not in fields:
+        columns.append(User.id)
+    if graph is None:
+        if "followers_count" in fields:
+            columns.append(_followers_count().label("followers_count"))
+        if "following_count" in fields:
+            columns.append(_following_count().label("following_count"))
+
+    result = []
+    for row in query.with_entities(*columns):
+        values = row._mapping
+        item = {}
+        for name in fields:
+            if name == "profile_picture_variants":
+                item[name] = variant_urls(values["profile_picture_url"], values["profile_picture_variants_ready"])
+            elif graph is not None and name == "followers_count":
+                item[name] = graph.follower_count(values["id"])
+            elif graph is not None and name == "following_count":
+                item[name] = graph.following_count(values["id"])
+            else:
+                item[name] = values[name]
+        result.append(item)
+    return result
+
+def get_profile_version(db: Session, username: str) -> Optional[tuple]:
+    """
+    Version markers for get_public_profile from one narrow query (the counts
+    come from the follow graph when it is loaded), or None if there is no
+    such user.
+    """
+    graph = follow_graph_service.get_graph()
+    columns = [User.id, User.updated_at]
+    if graph is None:
+        columns += [_followers_count(), _following_count()]
+    row = db.query(*columns).filter(User.username == username).first()
+    if row is None:
+        return None
+    if graph is not None:
+        return (row.id, row.updated_at, graph.follower_count(row.id), graph.following_count(row.id))
+    return tuple(row)
+
 def get_public_profile(db: Session, username: str) -> Optional[UserPublic]:
     user = get_by_username(db, username)
     if not user:
         return None
         
-    followers_count = len(user.followers)
-    following_count = len(user.following)
+    followers_count, following_count = follow_counts(user)
     
     return UserPublic(
         id=user.id,
@@ -43,28 +136,31 @@ def get_public_profile(db: Session, username: str) -> Optional[UserPublic]:
         full_name=user.full_name,
         bio=user.bio,
         profile_picture_url=user.profile_picture_url,
+        profile_picture_variants_ready=user.profile_picture_variants_ready,
         created_at=user.created_at,
         followers_count=followers_count,
         following_count=following_count
     )
 
-def search_users(db: Session, query: str, limit: int = 20) -> list[UserPublic]:
-    users = db.query(User).filter(
+def search_users(db: Session, query: str, limit: int = 20, fields: Optional[Sequence[str]] = None) -> list:
+    user_query = db.query(User).filter(
         (User.username.ilike(f"%{query}%")) | 
         (User.full_name.ilike(f"%{query}%"))
-    ).limit(limit).all()
-    
+    ).limit(limit)
+    if fields:
+        return project_users(user_query, fields)
     result = []
-    for user in users:
+    for user, followers_count, following_count in with_follow_counts(user_query):
         result.append(UserPublic(
             id=user.id,
             username=user.username,
             full_name=user.full_name,
             bio=user.bio,
             profile_picture_url=user.profile_picture_url,
+            profile_picture_variants_ready=user.profile_picture_variants_ready,
             created_at=user.created_at,
-            followers_count=len(user.followers),
-            following_count=len(user.following)
+            followers_count=followers_count,
+            following_count=following_count
         ))
     return result
 
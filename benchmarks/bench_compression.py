@@ -0,0 +1,102 @@
+"""
+CPU cost vs bytes saved for the compression levels CompressionMiddleware
+can use, on the payloads it mostly sees: a 50-post feed page and a
+200-entry follower list.
+
+Payloads are synthetic but shaped like the real responses (same schemas,
+owners repeated across posts, mixed-length text). Levels for codecs that
+are not installed (brotli, zstandard) are skipped.
+
+Usage:
+    python -m benchmarks.bench_compression [--rounds 200] [--budget 1.0]
+"""
+import argparse
+import gzip
+import random
+import time
+from datetime import datetime, timezone
+from typing import List
+import app.db  # noqa: F401  (loads models)
+from app.core import compression
+from app.core.serialization import get_adapter
+from app.schemas.social import Post
+from app.schemas.user import UserWithRelationship
+
+WORDS = "the a to of and in is it you that he was for on are with as his they at be this have from or one had by word but not what all were we when your can said there use an each which she do how their if will up other about out many then them these so some her would make like him into time has look two more write go see number no way could people my than first water been call who oil its now find long down day did get come made may part".split()
+
+def sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def make_user(rng: random.Random, i: int, now: datetime) -> dict:
+    return {
+        "id": i,
+        "username": f"user_{rng.randint(1000, 999999)}",
+        "full_name": sentence(rng, 2, 3).title(),
+        "bio": sentence(rng, 0, 25) or None,
+        "profile_picture_url": f"/uploads/{rng.randbytes(32).hex()}.jpg" if rng.random() < 0.7 else None,
+        "created_at": now,
+        "followers_count": rng.randint(0, 5000),
+        "following_count": rng.randint(0, 800),
+    }
+
+def payloads() -> dict:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    # A feed page usually shows a handful of accounts several times each
+    authors = [make_user(rng, i, now) for i in range(12)]
+    posts = [
+        {
+            "id": 10_000 + i,
+            "user_id": (owner := rng.choice(authors))["id"],
+            "owner": owner,
+            "content_text": sentence(rng, 5, 60),
+            "caption": sentence(rng, 0, 12) or None,
+            "media_url": f"/uploads/{rng.randbytes(32).hex()}.jpg" if rng.random() < 0.5 else None,
+            "created_at": now,
+            "likes_count": rng.randint(0, 20000),
+            "comments_count": rng.randint(0, 300),
+            "is_liked_by_me": rng.random() < 0.3,
+        }
+        for i in range(50)
+    ]
+    followers = [dict(make_user(rng, 100 + i, now), is_following=rng.random() < 0.4, is_followed_by=True) for i in range(200)]
+    return {
+        "feed (50 posts)": get_adapter(List[Post]).dump_json(get_adapter(List[Post]).validate_python(posts)),
+        "followers (200)": get_adapter(List[UserWithRelationship]).dump_json(
+            get_adapter(List[UserWithRelationship]).validate_python(followers)
+        ),
+    }
+
+def codecs():
+    for level in (1, 4, 6, 9):
+        yield f"gzip -{level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0)
+    if compression.brotli is not None:
+        for quality in (1, 4, 5, 6, 9, 11):
+            yield f"br q{quality}", lambda body, quality=quality: compression.brotli.compress(body, quality=quality)
+    if compression.zstandard is not None:
+        for level in (1, 3, 6, 9, 19):
+            compressor = compression.zstandard.ZstdCompressor(level=level)
+            yield f"zstd -{level}", compressor.compress
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--budget", type=float, default=1.0, help="max seconds per codec and payload")
+    args = parser.parse_args()
+
+    for name, body in payloads().items():
+        print(f"{name}: {len(body)} bytes")
+        print(f"  {'codec':<10} {'bytes':>8} {'ratio':>7} {'us/resp':>9} {'MB/s':>8}")
+        for label, compress in codecs():
+            out = compress(body)
+            # Fixed round count, but give up early on the very slow levels
+            start = time.perf_counter()
+            rounds = 0
+            while rounds < args.rounds and time.perf_counter() - start < args.budget:
+                compress(body)
+                rounds += 1
+            elapsed = (time.perf_counter() - start) / rounds
+            print(f"  {label:<10} {len(out):>8} {len(body) / len(out):>6.1f}x {elapsed * 1e6:>9.0f} {len(body) / elapsed / 1e6:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Like throughput on a single hot post: direct writes (post_service.like_post)
+vs the write-behind buffer (like_buffer_service).
+
+Uses a scratch SQLite database (or --database-url, e.g. a local Postgres)
+with one post and N distinct likers, driven by a thread pool the way the
+sync endpoints are. Throughput for write-behind is measured until the last
+like is durable, not just acknowledged.
+
+Usage:
+    python -m benchmarks.bench_hot_likes [--likes 5000] [--concurrency 16]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+import app.db  # noqa: F401  (loads models)
+from app.db import Base
+from app.models.like import Like
+from app.models.notification import Notification
+from app.models.post import Post
+from app.models.user import User
+from app.services import post_service, like_buffer_service
+
+def setup(Session, likers: int) -> int:
+    db = Session()
+    users = [User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash="x") for i in range(likers + 1)]
+    db.add_all(users)
+    db.commit()
+    post = Post(user_id=users[0].id, content_text="viral")
+    db.add(post)
+    db.commit()
+    post_id = post.id
+    db.close()
+    return post_id
+
+def reset(Session, post_id: int) -> None:
+    db = Session()
+    db.execute(delete(Like))
+    db.execute(delete(Notification))
+    db.execute(update(Post).values(likes_count=0))
+    db.commit()
+    db.close()
+
+def check(Session, post_id: int, expected: int) -> str:
+    db = Session()
+    count = db.get(Post, post_id).likes_count
+    rows = db.query(Like).filter(Like.post_id == post_id).count()
+    db.close()
+    return "ok" if count == rows == expected else f"MISMATCH counter={count} rows={rows}"
+
+def run_direct(Session, post_id: int, user_ids: list, concurrency: int) -> float:
+    def like(user_id):
+        db = Session()
+        try:
+            post_service.like_post(db, user_id, post_id)
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(like, user_ids))
+    return time.perf_counter() - start
+
+def run_write_behind(Session, post_id: int, user_ids: list, concurrency: int, interval: float) -> float:
+    like_buffer_service.SessionLocal = Session
+    stop = threading.Event()
+
+    def flusher():
+        while not stop.wait(interval):
+            like_buffer_service.flush()
+
+    def like(user_id):
+        db = Session()
+        try:
+            if like_buffer_service.post_exists(db, post_id):
+                like_buffer_service.record(user_id, post_id, liked=True)
+        finally:
+            db.close()
+
+    thread = threading.Thread(target=flusher)
+    start = time.perf_counter()
+    thread.start()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(like, user_ids))
+    stop.set()
+    thread.join()
+    like_buffer_service.flush()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--likes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--interval-ms", type=int, default=250)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        # Writers queue on SQLite's file lock instead of failing fast
+        connect_args = {"timeout": 60} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        post_id = setup(Session, args.likes)
+        user_ids = list(range(2, args.likes + 2))
+        print(f"{args.likes} likes on one post, {args.concurrency} concurrent clients ({engine.dialect.name})")
+
+        elapsed = run_direct(Session, post_id, user_ids, args.concurrency)
+        print(f"  direct        {args.likes / elapsed:>9.0f} likes/s  {check(Session, post_id, args.likes)}")
+
+        reset(Session, post_id)
+        elapsed = run_write_behind(Session, post_id, user_ids, args.concurrency, args.interval_ms / 1000)
+        print(f"  write-behind  {args.likes / elapsed:>9.0f} likes/s  {check(Session, post_id, args.likes)}")
+
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of the /uploads serving layer: plain StaticFiles vs MediaFiles.
+
+Runs both apps in-process through httpx's ASGI transport, so the numbers
+measure the Python request path (lookup, headers, 304 / Range handling),
+not the network or the kernel.
+
+Usage:
+    python -m benchmarks.bench_media [--requests 2000] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from app.core.media import MediaFiles
+
+def make_store(directory: str) -> dict:
+    files = {}
+    for ext, size in ((".jpg", 512 * 1024), (".mp4", 8 * 1024 * 1024)):
+        data = os.urandom(size)
+        name = f"{hashlib.sha256(data).hexdigest()}{ext}"
+        shard = os.path.join(directory, name[:2], name[2:4])
+        os.makedirs(shard, exist_ok=True)
+        with open(os.path.join(shard, name), "wb") as f:
+            f.write(data)
+        files[ext] = f"/uploads/{name[:2]}/{name[2:4]}/{name}"
+    return files
+
+async def run(client: httpx.AsyncClient, url: str, headers: dict, total: int, concurrency: int):
+    queue = iter(range(total))
+    statuses = {}
+
+    async def worker():
+        for _ in queue:
+            response = await client.get(url, headers=headers)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, statuses
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = make_store(directory)
+        apps = {
+            "StaticFiles": Starlette(routes=[Mount("/uploads", StaticFiles(directory=directory))]),
+            "MediaFiles": Starlette(routes=[Mount("/uploads", MediaFiles(directory=directory))]),
+        }
+
+        for label, app in apps.items():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                first = await client.get(files[".jpg"])
+                etag = first.headers["etag"]
+                print(f"\n{label}: cache-control={first.headers.get('cache-control')!r} etag={etag}")
+
+                scenarios = [
+                    ("full GET 512 KiB image", files[".jpg"], {}),
+                    ("revalidate (If-None-Match)", files[".jpg"], {"if-none-match": etag}),
+                    ("video seek (Range 1 MiB)", files[".mp4"], {"range": "bytes=4194304-5242879"}),
+                ]
+                for name, url, headers in scenarios:
+                    rate, statuses = await run(client, url, headers, args.requests, args.concurrency)
+                    print(f"  {name:<30} {rate:>9.0f} req/s  {statuses}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
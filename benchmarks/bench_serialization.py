@@ -0,0 +1,91 @@
+"""
+Encoding cost of a 50-post feed page: FastAPI's default response_model path
+vs app.core.serialization.json_response.
+
+Loads real ORM rows from a scratch SQLite database the way
+post_service.get_feed does, then times only the step from "list of Post rows"
+to "response body bytes". The default path is FastAPI's own
+serialize_response (validate, dump to primitives) followed by JSONResponse.
+
+Usage:
+    python -m benchmarks.bench_serialization [--posts 50] [--rounds 2000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app.db  # noqa: F401  (loads models)
+from app.db import Base
+from app.core.serialization import json_response
+from app.models.post import Post
+from app.models.user import User
+from app.schemas.social import Post as PostSchema
+from app.services import post_service
+
+def setup(Session, posts: int) -> None:
+    db = Session()
+    users = [User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash="x", full_name=f"Bench User {i}") for i in range(posts)]
+    db.add_all(users)
+    db.commit()
+    db.add_all([
+        Post(user_id=users[i].id, content_text="lorem ipsum " * 20, caption=f"caption {i}")
+        for i in range(posts)
+    ])
+    db.commit()
+    db.close()
+
+def timed(fn, rounds: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        setup(Session, args.posts)
+
+        db = Session()
+        rows = db.query(Post).order_by(Post.created_at.desc()).limit(args.posts).all()
+        for post in rows:
+            post_service._populate_post_details(post, 1)
+            post.owner  # load lazy relationships up front; only encoding is timed
+
+        field = create_model_field(name="response", type_=List[PostSchema], mode="serialization")
+        loop = asyncio.new_event_loop()
+
+        def default_path():
+            content = loop.run_until_complete(serialize_response(field=field, response_content=rows))
+            return JSONResponse(content).body
+
+        def fast_path():
+            return json_response(List[PostSchema], rows).body
+
+        assert default_path() == fast_path(), "outputs differ"
+        before = timed(default_path, args.rounds)
+        after = timed(fast_path, args.rounds)
+        print(f"{len(rows)}-post feed page, {len(fast_path())} bytes")
+        print(f"  response_model + JSONResponse  {before * 1e6:>8.0f} us")
+        print(f"  json_response                  {after * 1e6:>8.0f} us  ({before / after:.1f}x)")
+
+        loop.close()
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cost of finalizing a spooled multipart upload: the old chunked
+read-and-rewrite path vs the current save_upload_file.
+
+Each iteration stores a distinct 10 MB file that Starlette would already
+have rolled over to a temp file on disk. Reports wall time and process CPU
+time per upload (CPU includes threadpool work).
+
+Usage:
+    python -m benchmarks.bench_upload [--iterations 20] [--size-mb 10]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from starlette.datastructures import UploadFile
+import app.db  # noqa: F401  (loads models before file_service)
+from app.services import file_service
+
+def make_uploads(count: int, size: int) -> list:
+    uploads = []
+    for i in range(count):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        spooled.write(os.urandom(size))
+        spooled.seek(0)
+        uploads.append(UploadFile(spooled, filename=f"clip{i}.mp4", size=size))
+    return uploads
+
+async def measure(label: str, store, uploads: list) -> None:
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for upload in uploads:
+        await store(upload)
+    wall = (time.perf_counter() - wall) / len(uploads)
+    cpu = (time.process_time() - cpu) / len(uploads)
+    print(f"  {label:<28} {wall * 1000:8.2f} ms wall  {cpu * 1000:8.2f} ms cpu  per upload")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=10)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+    file_service.MAX_FILE_SIZE = max(file_service.MAX_FILE_SIZE, size)
+
+    upload_dir = tempfile.mkdtemp(dir=".")
+    file_service.UPLOAD_DIR = upload_dir
+    try:
+        print(f"{args.iterations} x {args.size_mb} MB uploads, spooled to disk")
+        await measure(
+            "chunked read + aiofiles", lambda f: file_service._stream_to_store(f, ".mp4"),
+            make_uploads(args.iterations, size),
+        )
+        await measure(
+            "save_upload_file", file_service.save_upload_file,
+            make_uploads(args.iterations, size),
+        )
+    finally:
+        shutil.rmtree(upload_dir)
+
+if __name__ == "__main__":
+    asyncio.run(main())
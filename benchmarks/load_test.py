@@ -0,0 +1,238 @@
+"""
+In-process load test: concurrent clients against the ASGI app, no server.
+
+Each client logs in as a random dataset user and then loops over a weighted
+mix of requests (feed, search, unread count, like/unlike, login) until
+--duration runs out. Requests go through httpx's ASGI transport, so the
+numbers include routing, auth, the database and serialization but not the
+network or a server's HTTP parsing.
+
+Reports requests/s and latency percentiles per route, and with --json
+writes them as a machine-readable file; --compare prints the change
+against an earlier file.
+
+Usage:
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --generate [--users 5000]
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --concurrency 32 --json after.json --compare before.json
+
+--generate (re)builds the dataset first with the seeder (see seed_db.py);
+without it the database must already hold one.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+SEARCH_TERMS = ["user1", "user4", "ada", "grace", "lovelace", "turing", "user12", "knuth"]
+
+# route name -> weight in the request mix
+MIX = {
+    "feed": 40,
+    "search": 15,
+    "unread_count": 25,
+    "like_unlike": 15,
+    "login": 5,
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, route, status, seconds):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+            ms = lambda value: round(value * 1000, 3)
+            routes[route] = {
+                "count": len(values),
+                "errors": sum(n for status, n in statuses.items() if status >= 400),
+                "statuses": {str(status): n for status, n in sorted(statuses.items())},
+                "rps": round(len(values) / elapsed, 2),
+                "mean_ms": ms(sum(values) / len(values)),
+                "p50_ms": ms(percentile(values, 0.50)),
+                "p95_ms": ms(percentile(values, 0.95)),
+                "p99_ms": ms(percentile(values, 0.99)),
+                "max_ms": ms(values[-1]),
+            }
+        return routes
+
+
+class Client:
+    def __init__(self, http, recorder, rng, user_count, post_count, password):
+        self.http = http
+        self.recorder = recorder
+        self.rng = rng
+        self.user_count = user_count
+        self.post_count = post_count
+        self.password = password
+        self.headers = {}
+        self.liked = []
+
+    async def timed(self, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await self.http.request(method, url, **kwargs)
+        self.recorder.record(route, response.status_code, time.perf_counter() - start)
+        return response
+
+    async def login(self):
+        user_id = self.rng.randint(1, self.user_count)
+        response = await self.timed(
+            "login", "POST", "/auth/login",
+            data={"username": f"user{user_id}", "password": self.password},
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            self.liked = []
+
+    async def feed(self):
+        await self.timed("feed", "GET", "/social/feed", headers=self.headers)
+
+    async def search(self):
+        q = self.rng.choice(SEARCH_TERMS)
+        await self.timed("search", "GET", "/users/search", params={"q": q}, headers=self.headers)
+
+    async def unread_count(self):
+        await self.timed("unread_count", "GET", "/notifications/unread-count", headers=self.headers)
+
+    async def like_unlike(self):
+        # Undo our own earlier likes half the time so the like table stays put
+        if self.liked and self.rng.random() < 0.5:
+            post_id = self.liked.pop()
+            await self.timed("unlike", "DELETE", f"/social/{post_id}/like", headers=self.headers)
+            return
+        post_id = self.rng.randint(1, self.post_count)
+        response = await self.timed("like", "POST", f"/social/{post_id}/like", headers=self.headers)
+        if response.status_code < 400:
+            self.liked.append(post_id)
+
+    async def run(self, deadline):
+        await self.login()
+        routes = list(MIX)
+        weights = list(MIX.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(routes, weights)[0])()
+
+
+async def run_load(app, args, user_count, post_count, password):
+    import httpx
+
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            rng = random.Random(args.seed)
+            clients = [
+                Client(http, recorder, random.Random(rng.random()), user_count, post_count, password)
+                for _ in range(args.concurrency)
+            ]
+            start = time.perf_counter()
+            await asyncio.gather(*(client.run(start + args.duration) for client in clients))
+            elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+def print_table(routes, total_rps):
+    print(f"{'route':<14}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, stats in routes.items():
+        print(
+            f"{route:<14}{stats['count']:>8}{stats['errors']:>8}{stats['rps']:>9.1f}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+        )
+    print(f"total {total_rps:.1f} req/s")
+
+def print_comparison(routes, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["routes"]
+    print(f"\nchange vs {baseline_path} (negative latency / positive rps is better)")
+    print(f"{'route':<14}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    change = lambda new, old: f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+    for route, stats in routes.items():
+        old = baseline.get(route)
+        if old is None:
+            print(f"{route:<14}  (not in baseline)")
+            continue
+        print(
+            f"{route:<14}{change(stats['rps'], old['rps']):>9}{change(stats['p50_ms'], old['p50_ms']):>9}"
+            f"{change(stats['p95_ms'], old['p95_ms']):>9}{change(stats['p99_ms'], old['p99_ms']):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--generate", action="store_true", help="rebuild the dataset first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json file to compare against")
+
+    # Settings are read at import time: point the app at the benchmark database
+    # before anything under app/ is imported
+    os.environ["DATABASE_URL"] = parser.parse_known_args()[0].database_url
+    os.environ.setdefault("SMTP_SERVER", "localhost")
+    os.environ.setdefault("SENDER_EMAIL", "bench@example.com")
+    os.environ.setdefault("SENDER_PASSWORD", "unused")
+    from sqlalchemy import create_engine
+    import seed_db
+    from app.db import seed
+    from app.main import app
+
+    seed_db.add_arguments(parser)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.generate:
+        seed.prepare_schema(engine, reset=True)
+        seed_db.run(engine, args)
+    size = seed.dataset_size(engine)
+    engine.dispose()
+    if not size["users"] or not size["posts"]:
+        sys.exit("database has no dataset; run with --generate")
+    print("dataset: " + ", ".join(f"{table} {count:,}" for table, count in size.items()))
+
+    recorder, elapsed = asyncio.run(run_load(app, args, size["users"], size["posts"], args.password))
+    routes = recorder.summary(elapsed)
+    total_rps = sum(stats["count"] for stats in routes.values()) / elapsed
+    print_table(routes, total_rps)
+
+    if args.json:
+        result = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "database": args.database_url.split(":", 1)[0],
+                "dataset": size,
+                "concurrency": args.concurrency,
+                "duration_s": round(elapsed, 3),
+                "seed": args.seed,
+                "python": platform.python_version(),
+            },
+            "total_rps": round(total_rps, 2),
+            "routes": routes,
+        }
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.json}")
+    if args.compare:
+        print_comparison(routes, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Fill a database with a synthetic social graph (see app/db/seed.py) for
+local testing, staging or benchmarks, without going through the API.
+
+Usage:
+    python seed_db.py --users 100000                      # into DATABASE_URL, which must be empty
+    python seed_db.py --users 100000 --reset              # drop and recreate all tables first
+    python seed_db.py --database-url sqlite:///seed.db --users 5000 --seed 7
+
+Tables are created from the models, so run `alembic stamp head` afterwards
+if the database will be migrated later. Every user logs in as userN with
+--password.
+"""
+import argparse
+import sys
+import time
+from sqlalchemy import create_engine
+from app.core.config import settings
+from app.db import seed
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--avg-follows", type=float, default=50)
+    parser.add_argument("--avg-posts", type=float, default=10)
+    parser.add_argument("--avg-likes", type=float, default=20, help="per post")
+    parser.add_argument("--avg-comments", type=float, default=2, help="per post")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default=seed.DEFAULT_PASSWORD)
+    parser.add_argument("--chunk-size", type=int, default=seed.CHUNK_SIZE)
+
+def run(engine, args) -> None:
+    start = time.perf_counter()
+    counts = seed.populate(
+        engine,
+        users=args.users,
+        avg_follows=args.avg_follows,
+        avg_posts=args.avg_posts,
+        avg_likes=args.avg_likes,
+        avg_comments=args.avg_comments,
+        seed=args.seed,
+        password=args.password,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"  {table:<14} {count:>12,}")
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    try:
+        seed.prepare_schema(engine, reset=args.reset)
+    except ValueError as e:
+        sys.exit(str(e))
+    run(engine, args)
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Move flat files in uploads/ into the sharded layout (uploads/ab/cd/<name>)
+and rewrite posts.media_url / users.profile_picture_url to match.
+
+Usage:
+    python shard_uploads.py            # move files and update the database
+    python shard_uploads.py --dry-run  # only report what would change
+
+Safe on a live server: per batch, files are hard-linked into their shard,
+the URL rewrite is committed, and only then are the flat names removed, so
+every URL in the database resolves at every point. Safe to re-run after an
+interruption: only files still sitting directly in uploads/ are touched.
+"""
+import argparse
+import os
+import shutil
+from sqlalchemy import text
+from app.db.session import SessionLocal
+from app.services.file_service import UPLOAD_DIR, url_for, path_for_url
+
+BATCH_SIZE = 1000
+
+def find_flat_files():
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith("."):
+                yield entry.name
+
+def find_flat_urls(db):
+    # Legacy URLs have no directory component after /uploads/
+    query = text("""
+        SELECT media_url FROM posts WHERE media_url LIKE '/uploads/%' AND media_url NOT LIKE '/uploads/%/%'
+        UNION
+        SELECT profile_picture_url FROM users WHERE profile_picture_url LIKE '/uploads/%' AND profile_picture_url NOT LIKE '/uploads/%/%'
+    """)
+    return [row[0] for row in db.execute(query)]
+
+def rewrite_urls(db, mapping):
+    params = [{"old": old, "new": new} for old, new in mapping]
+    db.execute(text("UPDATE posts SET media_url = :new WHERE media_url = :old"), params)
+    db.execute(text("UPDATE users SET profile_picture_url = :new WHERE profile_picture_url = :old"), params)
+    db.commit()
+
+def link_into_shard(name):
+    flat_path = os.path.join(UPLOAD_DIR, name)
+    new_path = path_for_url(url_for(name))
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    try:
+        os.link(flat_path, new_path)
+    except FileExistsError:
+        pass  # linked by an interrupted earlier run
+    except OSError:
+        shutil.copy2(flat_path, new_path)  # no hard links on this filesystem
+
+def move_batch(db, names):
+    for name in names:
+        link_into_shard(name)
+    rewrite_urls(db, [(f"/uploads/{name}", url_for(name)) for name in names])
+    for name in names:
+        os.remove(os.path.join(UPLOAD_DIR, name))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    moved = 0
+    rewritten = 0
+    try:
+        # 1. Link, rewrite, unlink, one batch of flat files at a time
+        batch = []
+        for name in find_flat_files():
+            batch.append(name)
+            if len(batch) >= BATCH_SIZE:
+                if not args.dry_run:
+                    move_batch(db, batch)
+                moved += len(batch)
+                batch = []
+        if batch:
+            if not args.dry_run:
+                move_batch(db, batch)
+            moved += len(batch)
+
+        # 2. Rows still pointing at a flat URL whose file already lives in a
+        # shard (left behind by older versions of this script)
+        if args.dry_run:
+            leftovers = []
+        else:
+            leftovers = [
+                (old_url, url_for(old_url[len("/uploads/"):])) for old_url in find_flat_urls(db)
+                if os.path.exists(path_for_url(url_for(old_url[len("/uploads/"):])))
+            ]
+        for i in range(0, len(leftovers), BATCH_SIZE):
+            rewrite_urls(db, leftovers[i:i + BATCH_SIZE])
+        rewritten = len(leftovers)
+    finally:
+        db.close()
+
+    prefix = "Would move" if args.dry_run else "Moved"
+    print(f"{prefix} {moved} files, {rewritten} leftover URLs rewritten.")
+
+if __name__ == "__main__":
+    main()
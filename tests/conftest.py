@@ -0,0 +1,32 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+# Settings are read at import time: never let tests pick up a real
+# database or mail server from the environment or .env
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["SMTP_SERVER"] = "localhost"
+os.environ["SENDER_EMAIL"] = "tests@example.com"
+os.environ["SENDER_PASSWORD"] = "unused"
+os.environ["GROQ_API_KEY"] = ""
+
+# Registers every model on Base (and must come before importing any model)
+from app.db import Base  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = Session(bind=engine)
+    yield session
+    session.close()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.core import cache
+from app.services.ai_service import GroqAIService
+
+BIOS = ["Bio one ✨", "Bio two 🚀", "Bio three 💡"]
+
+
+class FakeAsyncGroq:
+    """Stands in for AsyncGroq: counts chat.completions.create calls and can hold them."""
+
+    def __init__(self, bios=BIOS):
+        self.bios = bios
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if stream:
+            return self._stream(json.dumps(self.bios))
+        message = SimpleNamespace(content=json.dumps(self.bios))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self, text):
+        for start in range(0, len(text), 8):
+            await asyncio.sleep(0)
+            delta = SimpleNamespace(content=text[start:start + 8])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def test_normalized_keywords_hit_the_cache():
+    async def run():
+        client = FakeAsyncGroq()
+        service = GroqAIService(client=client)
+        first = await service.generate_bio_suggestions("Traveler, photographer,traveler")
+        second = await service.generate_bio_suggestions("photographer, traveler")
+        return client, service, first, second
+
+    client, service, first, second = asyncio.run(run())
+    assert first == second == BIOS
+    assert client.calls == 1
+    assert service.cache.stats()["hits"] == 1
+
+
+def test_concurrent_identical_requests_share_one_call():
+    async def run():
+        client = FakeAsyncGroq()
+        client.release.clear()
+        service = GroqAIService(client=client)
+        requests = [asyncio.create_task(service.generate_bio_suggestions("coffee, books")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        client.release.set()
+        return client, service, await asyncio.gather(*requests)
+
+    client, service, results = asyncio.run(run())
+    assert results == [BIOS] * 5
+    assert client.calls == 1
+    assert service.coalesced == 4
+
+
+def test_expired_entries_go_upstream_again(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    async def run():
+        client = FakeAsyncGroq()
+        service = GroqAIService(client=client)
+        await service.generate_bio_suggestions("coffee, books")
+        now[0] += service.cache.ttl - 1
+        await service.generate_bio_suggestions("coffee, books")
+        calls_within_ttl = client.calls
+        now[0] += 2
+        await service.generate_bio_suggestions("coffee, books")
+        return calls_within_ttl, client.calls
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_cancelled_trial_call_reopens_the_half_open_slot():
+    async def run():
+        client = FakeAsyncGroq()
+        service = GroqAIService(client=client)
+        service.breaker.opened_at = 0.0  # long past reset_timeout: half-open
+        client.release.clear()
+        trial = asyncio.create_task(service._request_bios("coffee, books", 3))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+        return service.breaker.allow()
+
+    assert asyncio.run(run()) is True
+
+
+def test_first_caller_disconnecting_does_not_fail_the_others():
+    async def run():
+        client = FakeAsyncGroq()
+        client.release.clear()
+        service = GroqAIService(client=client)
+        first = asyncio.create_task(service.generate_bio_suggestions("coffee, books"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(service.generate_bio_suggestions("coffee, books"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        client.release.set()
+        return client, first, await second
+
+    client, first, result = asyncio.run(run())
+    assert first.cancelled()
+    assert result == BIOS
+    assert client.calls == 1
+
+
+def test_stream_yields_bios_and_caches_them():
+    async def run():
+        client = FakeAsyncGroq()
+        service = GroqAIService(client=client)
+        events = [event async for event in service.stream_bio_suggestions("coffee, books")]
+        cached = await service.generate_bio_suggestions("coffee, books")
+        return client, events, cached
+
+    client, events, cached = asyncio.run(run())
+    assert [value for kind, value in events if kind == "bio"] == BIOS
+    assert cached == BIOS
+    assert client.calls == 1
+
+
+def test_stream_client_disconnect_frees_the_slot_and_the_trial():
+    async def run():
+        service = GroqAIService(client=FakeAsyncGroq())
+        service._semaphore = asyncio.Semaphore(1)
+        service.breaker.opened_at = 0.0  # half-open: this stream is the trial
+        stream = service.stream_bio_suggestions("coffee, books")
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        return service
+
+    service = asyncio.run(run())
+    assert not service._semaphore.locked()
+    assert service.breaker.allow() is True
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.models.comment import Comment
+from app.models.post import Post
+from app.models.user import User
+from app.services import post_service
+
+
+def seed_comments(db, count, created_at=None):
+    user = User(username="u", email="u@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    post = Post(user_id=user.id, content_text="hello")
+    db.add(post)
+    db.flush()
+    # created_at=None: server default, whole seconds like real comments
+    db.add_all(
+        Comment(user_id=user.id, post_id=post.id, comment_text=str(i), created_at=created_at)
+        for i in range(count)
+    )
+    db.commit()
+    return post.id
+
+
+def walk(db, post_id, limit):
+    ids, cursor = [], None
+    while True:
+        comments, cursor = post_service.get_comments_page(db, post_id, cursor, limit)
+        ids.extend(comment.id for comment in comments)
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_same_second_comments_once(db):
+    post_id = seed_comments(db, 45)
+    assert walk(db, post_id, 20) == sorted(range(1, 46))
+
+
+def test_pages_with_fractional_timestamps(db):
+    post_id = seed_comments(db, 7, created_at=datetime(2026, 1, 2, 3, 4, 5, 678901))
+    assert walk(db, post_id, 3) == list(range(1, 8))
+
+
+def test_cursor_query_is_an_index_range_scan(engine, db):
+    post_id = seed_comments(db, 3)
+    _, cursor = post_service.get_comments_page(db, post_id, None, 1)
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        post_service.get_comments_page(db, post_id, cursor, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = next(item for item in executed if "FROM comments" in item[0])
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "USING INDEX ix_comments_post_id_created_at_id" in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,30 @@
+from sqlalchemy import event
+
+from app.models.follow import Follow
+from app.models.user import User
+from app.services import user_service
+
+
+def test_search_counts_follows_in_the_listing_query(engine, db):
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(5)]
+    db.add_all(users)
+    db.flush()
+    # u0 follows everyone else; everyone else follows u0
+    db.add_all(Follow(follower_id=users[0].id, following_id=user.id) for user in users[1:])
+    db.add_all(Follow(follower_id=user.id, following_id=users[0].id) for user in users[1:])
+    db.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = user_service.search_users(db, "u")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    counts = {user.username: (user.followers_count, user.following_count) for user in result}
+    assert counts == {"u0": (4, 4), "u1": (1, 1), "u2": (1, 1), "u3": (1, 1), "u4": (1, 1)}
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.api import social
+from app.core.config import settings
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+from app.services import like_buffer_service
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "write-behind"])
+def write_behind(request, monkeypatch, engine):
+    monkeypatch.setattr(settings, "LIKE_WRITE_BEHIND", request.param)
+    monkeypatch.setattr(like_buffer_service, "SessionLocal", lambda: Session(engine))
+    yield request.param
+    like_buffer_service._pending.clear()
+    like_buffer_service._known_posts.clear()
+
+
+@pytest.fixture
+def user_and_post(db):
+    user = User(username="u", email="u@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    post = Post(user_id=user.id, content_text="hello")
+    db.add(post)
+    db.commit()
+    return user, post.id
+
+
+def test_unlike_missing_post_is_404(db, user_and_post, write_behind):
+    user, _ = user_and_post
+    with pytest.raises(HTTPException) as error:
+        social.unlike_post(999, db, user)
+    assert error.value.status_code == 404
+    assert not like_buffer_service._pending
+
+
+def test_unlike_without_like_is_a_no_op(db, user_and_post, write_behind):
+    user, post_id = user_and_post
+    assert social.unlike_post(post_id, db, user) == {"message": "Post unliked"}
+    like_buffer_service.flush()
+    db.expire_all()
+    assert db.get(Post, post_id).likes_count == 0
+    assert db.query(Like).count() == 0
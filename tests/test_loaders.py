@@ -0,0 +1,104 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.comment import Comment
+from app.models.like import Like
+from app.models.post import Post
+from app.models.user import User
+from app.schemas.social import Post as PostSchema, PostDetail
+from app.services import post_service
+
+
+class NoBatching:
+    """The pre-loader behaviour: every post.owner / comment.user is a lazy load."""
+
+    def load_many(self, user_ids):
+        return {}
+
+
+def seed_post(db, commenters):
+    owner = User(username="owner", email="owner@example.com", password_hash="x")
+    users = [User(username=f"c{i}", email=f"c{i}@example.com", password_hash="x") for i in range(commenters)]
+    db.add_all([owner, *users])
+    db.flush()
+    post = Post(user_id=owner.id, content_text="hello")
+    db.add(post)
+    db.flush()
+    db.add_all(Comment(user_id=user.id, post_id=post.id, comment_text="hi") for user in users)
+    db.commit()
+    return post.id, owner.id
+
+
+def count_detail_statements(engine, post_id, viewer_id):
+    """Statements for one GET /social/{post_id}: get_post plus PostDetail serialization."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(bind=engine) as db:
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            PostDetail.model_validate(post_service.get_post(db, post_id, viewer_id)).model_dump()
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+    return len(statements)
+
+
+def test_post_detail_loads_comment_authors_in_one_query(engine, db, monkeypatch):
+    page = post_service.COMMENTS_PAGE_SIZE
+    post_id, owner_id = seed_post(db, commenters=page * 2)
+
+    batched = count_detail_statements(engine, post_id, owner_id)
+    monkeypatch.setattr(post_service, "get_user_loader", lambda db: NoBatching())
+    unbatched = count_detail_statements(engine, post_id, owner_id)
+
+    # One IN query instead of a lazy load for the owner and each author on the page
+    assert unbatched - batched == page
+    assert batched <= 5
+
+
+def test_post_detail_statements_do_not_grow_with_comments(engine, db):
+    post_id, owner_id = seed_post(db, commenters=3)
+    few = count_detail_statements(engine, post_id, owner_id)
+
+    with Session(bind=engine) as other:
+        users = [User(username=f"late{i}", email=f"late{i}@example.com", password_hash="x") for i in range(50)]
+        other.add_all(users)
+        other.flush()
+        other.add_all(Comment(user_id=user.id, post_id=post_id, comment_text="hi") for user in users)
+        other.commit()
+
+    assert count_detail_statements(engine, post_id, owner_id) == few
+
+
+def count_feed_statements(engine, user_id):
+    """Statements for one GET /social/feed page, plus the serialized posts."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(bind=engine) as db:
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            posts = [PostSchema.model_validate(p).model_dump() for p in post_service.get_feed(db, user_id)]
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+    return len(statements), posts
+
+
+def test_feed_counts_comments_and_likes_per_page(engine, db):
+    post_id, owner_id = seed_post(db, commenters=3)
+    db.add(Like(user_id=owner_id, post_id=post_id))
+    db.commit()
+    few, posts = count_feed_statements(engine, owner_id)
+    assert [(p["comments_count"], p["is_liked_by_me"]) for p in posts] == [(3, True)]
+
+    with Session(bind=engine) as other:
+        other.add_all(Post(user_id=owner_id, content_text=f"more {i}") for i in range(20))
+        other.commit()
+
+    many, posts = count_feed_statements(engine, owner_id)
+    assert many == few
+    assert sorted((p["comments_count"], p["is_liked_by_me"]) for p in posts) == [(0, False)] * 20 + [(3, True)]
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from app.core.profiling import ProfiledRoute, ProfileStore, ProfilingMiddleware
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@router.get("/profiled")
+def profiled_endpoint():
+    spin(0.1)
+    return {"ok": True}
+
+
+@router.get("/unprofiled")
+def unprofiled_endpoint():
+    spin(0.1)
+    return {"ok": True}
+
+
+def make_app(store):
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, store=store, token="secret", interval=0.001)
+    return app
+
+
+def test_sync_endpoint_samples_are_attributed_to_their_request():
+    store = ProfileStore()
+    app = make_app(store)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(
+                client.get("/profiled", headers={"X-Profile": "secret"}),
+                client.get("/unprofiled"),
+            )
+
+    profiled, unprofiled = asyncio.run(run())
+    assert "X-Profile-Id" not in unprofiled.headers
+    profile = store.get(profiled.headers["X-Profile-Id"])
+
+    # Worker-thread stacks reach the endpoint; another request's worker never leaks in
+    stacks = profile.collapsed()
+    assert "profiled_endpoint;tests.test_profiling:spin" in stacks
+    assert "unprofiled_endpoint" not in stacks